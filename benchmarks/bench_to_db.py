@@ -0,0 +1,264 @@
+"""
+Benchmark to_db against a local PostgreSQL.
+
+Runs to_db over a matrix of row counts, column counts, dtype mixes, insert vs
+upsert and COPY formats, one case per subprocess so peak RSS is per case, and
+prints one JSON object per case to stdout::
+
+    python benchmarks/bench_to_db.py --dsn "host=localhost dbname=bench" > new.jsonl
+    python benchmarks/bench_to_db.py --rows 1000 100000 --baseline old.jsonl
+
+Without --dsn (or BENCH_PG_DSN) a throwaway cluster is created with initdb and
+pg_ctl in a temporary directory and removed afterwards. Each case loads into a
+freshly created table, upserts first load half the rows untimed so half of the
+timed rows conflict.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DTYPE_MIXES = {
+    "strings": ["text"],
+    "uuids": ["uuid"],
+    "timestamptz": ["timestamptz"],
+    "enums": ["enum"],
+    "mixed": ["text", "uuid", "timestamptz", "enum", "bigint", "double"],
+}
+PG_TYPES = {
+    "text": "text",
+    "uuid": "uuid",
+    "timestamptz": "timestamp with time zone",
+    "enum": "bench_kind",
+    "bigint": "bigint",
+    "double": "double precision",
+}
+ENUM_LABELS = ["alpha", "beta", "gamma", "delta"]
+TABLE = "bench_to_db"
+
+
+def make_frame(rows: int, cols: int, dtypes: str, seed: int = 0):
+    """Return a frame with a unique ``id`` and ``cols - 1`` columns cycling the mix."""
+    import numpy as np
+    import polars as pl
+    import pyarrow as pa
+
+    rng = np.random.default_rng(seed)
+    columns = {"id": pl.int_range(rows, eager=True, dtype=pl.Int64)}
+    kinds = itertools.cycle(DTYPE_MIXES[dtypes])
+    for i in range(1, cols):
+        kind = next(kinds)
+        if kind == "text":
+            s = pl.Series(rng.integers(0, 10**9, rows)).cast(pl.String)
+            s = "value_" + s
+        elif kind == "uuid":
+            raw = pa.FixedSizeBinaryArray.from_buffers(
+                pa.binary(16), rows, [None, pa.py_buffer(rng.bytes(16 * rows))]
+            )
+            hexed = pl.Series(raw.cast(pa.binary())).bin.encode("hex")
+            s = pl.select(
+                pl.concat_str(
+                    [
+                        hexed.str.slice(start, length)
+                        for start, length in (
+                            (0, 8),
+                            (8, 4),
+                            (12, 4),
+                            (16, 4),
+                            (20, 12),
+                        )
+                    ],
+                    separator="-",
+                )
+            ).to_series()
+        elif kind == "timestamptz":
+            us = rng.integers(1_577_836_800_000_000, 1_893_456_000_000_000, rows)
+            s = pl.Series(us).cast(pl.Datetime("us")).dt.replace_time_zone("UTC")
+        elif kind == "enum":
+            s = pl.Series(rng.integers(0, len(ENUM_LABELS), rows)).replace_strict(
+                dict(enumerate(ENUM_LABELS)), return_dtype=pl.String
+            )
+        elif kind == "bigint":
+            s = pl.Series(rng.integers(-(2**62), 2**62, rows))
+        else:
+            s = pl.Series(rng.standard_normal(rows))
+        columns[f"c{i}_{kind}"] = s
+    return pl.DataFrame(columns)
+
+
+async def run_case(dsn: str, case: dict) -> dict:
+    """Load one case into a fresh table and return its measurements."""
+    import polars as pl
+    from psycopg import AsyncConnection
+    from psycopg.sql import SQL, Identifier, Literal
+
+    from dean_utils import invalidate_table_defs, to_db
+
+    df = make_frame(case["rows"], case["cols"], case["dtypes"])
+    upsert = ("id",) if case["mode"] == "upsert" else None
+    async with await AsyncConnection.connect(dsn, autocommit=True) as conn:
+        await conn.execute(SQL("DROP TABLE IF EXISTS {}").format(Identifier(TABLE)))
+        await conn.execute("DROP TYPE IF EXISTS bench_kind")
+        await conn.execute(
+            SQL("CREATE TYPE bench_kind AS ENUM ({})").format(
+                SQL(", ").join(Literal(x) for x in ENUM_LABELS)
+            )
+        )
+        kinds = [name.split("_", 1)[1] for name in df.columns[1:]]
+        await conn.execute(
+            SQL("CREATE TABLE {} (id bigint PRIMARY KEY{})").format(
+                Identifier(TABLE),
+                SQL("").join(
+                    SQL(", {} {}").format(Identifier(name), SQL(PG_TYPES[kind]))
+                    for name, kind in zip(df.columns[1:], kinds)
+                ),
+            )
+        )
+        invalidate_table_defs(conn, TABLE)
+        if upsert is not None:
+            await to_db(conn, df.head(case["rows"] // 2), TABLE, format=case["format"])
+        start = time.perf_counter()
+        stats = await to_db(conn, df, TABLE, upsert, format=case["format"])
+        seconds = time.perf_counter() - start
+        await conn.execute(SQL("DROP TABLE {}").format(Identifier(TABLE)))
+    # estimated_size is the in-memory size of the frame, the closest thing to a
+    # payload size that doesn't depend on the COPY format
+    megabytes = df.estimated_size() / 1e6
+    return {
+        **case,
+        "seconds": seconds,
+        "rows_per_s": case["rows"] / seconds,
+        "mb_per_s": megabytes / seconds,
+        # ru_maxrss is KiB on linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "timings": stats.timings,
+        "polars": pl.__version__,
+    }
+
+
+@contextlib.contextmanager
+def throwaway_postgres():
+    """Start a PostgreSQL cluster in a temporary directory and yield its DSN."""
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if initdb is None or pg_ctl is None:
+        msg = "no --dsn or BENCH_PG_DSN given and initdb/pg_ctl aren't on PATH"
+        raise SystemExit(msg)
+    tmp = Path(tempfile.mkdtemp(prefix="bench_pg_"))
+    data = tmp / "data"
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    subprocess.run(
+        [initdb, "-D", str(data), "-U", "bench", "--auth=trust", "-E", "UTF8"],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        [
+            pg_ctl,
+            "-D",
+            str(data),
+            "-o",
+            f"-p {port} -k {tmp} -c listen_addresses=''",
+            "-l",
+            str(tmp / "postgres.log"),
+            "-w",
+            "start",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    try:
+        yield f"host={tmp} port={port} user=bench dbname=postgres"
+    finally:
+        subprocess.run(
+            [pg_ctl, "-D", str(data), "-m", "fast", "stop"], capture_output=True
+        )
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def case_key(case: dict) -> tuple:
+    return tuple(case[k] for k in ("rows", "cols", "dtypes", "mode", "format"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_PG_DSN"))
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--cols", type=int, nargs="+", default=[4, 16])
+    parser.add_argument(
+        "--dtypes", nargs="+", choices=list(DTYPE_MIXES), default=list(DTYPE_MIXES)
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=["insert", "upsert"], default=["insert", "upsert"]
+    )
+    parser.add_argument(
+        "--formats", nargs="+", choices=["text", "binary"], default=["text", "binary"]
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="JSON lines from an earlier run, adds rows_per_s_vs_baseline to each case",
+    )
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case is not None:
+        # a single case in its own process, so peak RSS is only its own
+        print(json.dumps(asyncio.run(run_case(args.dsn, json.loads(args.case)))))
+        return
+
+    baseline = {}
+    if args.baseline is not None:
+        for line in args.baseline.read_text().splitlines():
+            if line.strip():
+                record = json.loads(line)
+                baseline[case_key(record)] = record["rows_per_s"]
+
+    server = (
+        contextlib.nullcontext(args.dsn)
+        if args.dsn is not None
+        else throwaway_postgres()
+    )
+    with server as dsn:
+        for rows, cols, dtypes, mode, copy_format in itertools.product(
+            args.rows, args.cols, args.dtypes, args.modes, args.formats
+        ):
+            case = {
+                "rows": rows,
+                "cols": cols,
+                "dtypes": dtypes,
+                "mode": mode,
+                "format": copy_format,
+            }
+            proc = subprocess.run(
+                [sys.executable, __file__, "--dsn", dsn, "--case", json.dumps(case)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                record = {**case, "error": proc.stderr.strip().splitlines()[-1:]}
+            else:
+                record = json.loads(proc.stdout.strip().splitlines()[-1])
+                if (base := baseline.get(case_key(case))) is not None:
+                    record["rows_per_s_vs_baseline"] = record["rows_per_s"] / base
+            print(json.dumps(record), flush=True)
+
+
+if __name__ == "__main__":
+    main()
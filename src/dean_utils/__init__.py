@@ -5,17 +5,29 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any, TypeAlias, TypedDict
 
 __all__ = [
+    "BlobCache",
+    "DuplicateKeysError",
+    "LoadStats",
+    "ParallelLoadError",
     "Queue",
     "QueueRetry",
     "async_abfs",
     "az_send",
     "clear_messages",
     "delete_message",
+    "drop_staging_tables",
+    "from_db",
     "get_queue_properties",
     "global_async_client",
+    "invalidate_table_defs",
+    "iter_from_db",
     "peek_messages",
+    "prefetch_table_defs",
     "send_message",
     "to_db",
+    "to_db_delta",
+    "to_db_many",
+    "to_db_parallel",
     "update_queue",
 ]
 import contextlib
@@ -23,10 +35,22 @@ import os
 from datetime import timedelta
 
 from dean_utils.utils.az_storage_queues import Queue
-from dean_utils.utils.pl_to_db import to_db
+from dean_utils.utils.pl_from_db import from_db, iter_from_db
+from dean_utils.utils.pl_to_db import (
+    DuplicateKeysError,
+    LoadStats,
+    ParallelLoadError,
+    drop_staging_tables,
+    invalidate_table_defs,
+    prefetch_table_defs,
+    to_db,
+    to_db_delta,
+    to_db_many,
+    to_db_parallel,
+)
 
 with contextlib.suppress(ImportError):
-    from dean_utils.utils.async_abfs import async_abfs
+    from dean_utils.utils.async_abfs import BlobCache, async_abfs
 with contextlib.suppress(ImportError):
     from dean_utils.utils.az_storage_queues import Queue, QueueRetry
 with contextlib.suppress(ImportError):
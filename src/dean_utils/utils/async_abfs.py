@@ -1,8 +1,14 @@
 from __future__ import annotations
 
 import asyncio
+import io
 import os
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
 from pathlib import Path
 from typing import (
     IO,
@@ -15,15 +21,44 @@ from typing import (
 from uuid import uuid4
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, Iterable
 
     import httpx
+    import polars as pl
     from azure.storage.blob import BlobBlock
     from azure.storage.blob._models import BlobProperties
-    from azure.storage.blob.aio import BlobClient
+    from azure.storage.blob.aio import (
+        BlobClient,
+        BlobServiceClient,
+        ContainerClient,
+        StorageStreamDownloader,
+    )
+    from pyarrow.parquet import FileMetaData
 
 HTTPX_METHODS: TypeAlias = Literal["GET", "POST"]
 
+STREAM_BLOCK_SIZE = 4 * 1024 * 1024
+STREAM_MAX_CONCURRENCY = 8
+# stream_up picks its block size between these, aiming for about 1,000 blocks
+UPLOAD_MIN_BLOCK_SIZE = 4 * 1024 * 1024
+UPLOAD_MAX_BLOCK_SIZE = 100 * 1024 * 1024
+MAX_BLOCKS = 50_000
+# range size for read and download_to
+READ_CHUNK_SIZE = 8 * 1024 * 1024
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# bytes read from the end of a parquet file hoping to get the whole footer at once
+PQ_FOOTER_GUESS = 64 * 1024
+PQ_METADATA_CACHE_SIZE = 1024
+PQ_INDEX_NAME = "_pq_index.parquet"
+# column chunks closer than this are fetched with one range GET
+PQ_RANGE_GAP = 64 * 1024
+# bytes fetched for a parquet page header, and most page headers walked per chunk
+PQ_PAGE_HEADER_GUESS = 16 * 1024
+PQ_PAGE_WALK_LIMIT = 16
+
+# (account/path, etag) -> parsed footer, least recently used first
+_pq_metadata_cache: OrderedDict[tuple[str, str], FileMetaData] = OrderedDict()
+
 
 class abfs_writer:
     def __init__(self, connection_string: str, path: str):
@@ -78,8 +113,26 @@ class abfs_writer:
 
 
 class async_abfs:
+    """
+    Async helpers for an Azure storage account.
+
+    Every method shares one BlobServiceClient and one async adlfs filesystem,
+    made on first use, over a single aiohttp session whose connection pool holds
+    up to ``max_connections`` keep-alive connections. Use it as an async context
+    manager, or call ``aclose()``, to close them. The session belongs to the
+    event loop it was made in, so don't share an instance across loops.
+
+    With a BlobCache as ``cache``, read, read_json and stream_read keep what they
+    download on local disk and only transfer a blob again once its ETag changes.
+    """
+
     def __init__(
-        self, fsspec_protocol: str = "abfss", connection_string: str | None = None
+        self,
+        fsspec_protocol: str = "abfss",
+        connection_string: str | None = None,
+        *,
+        max_connections: int = 100,
+        cache: BlobCache | None = None,
     ):
         import fsspec
 
@@ -99,6 +152,77 @@ class async_abfs:
         }
         stor = {key_conv[key]: val for key, val in stor.items() if key in key_conv}
         self.stor = stor
+        self.max_connections = max_connections
+        self.cache = cache
+        self._session = None
+        self._service: BlobServiceClient | None = None
+        self._containers: dict[str, ContainerClient] = {}
+        self._fs = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the shared clients and their connections, they're remade if used again."""
+        service, session = self._service, self._session
+        self._service = self._session = self._fs = None
+        self._containers = {}
+        if service is not None:
+            await service.close()
+        if session is not None:
+            await session.close()
+
+    async def service_client(self) -> BlobServiceClient:
+        """Return the shared BlobServiceClient, making it and its session on first use."""
+        if self._service is None:
+            import aiohttp
+            from azure.core.pipeline.transport import AioHttpTransport
+            from azure.storage.blob.aio import BlobServiceClient
+
+            # azure checks content hashes itself so it needs the raw bytes
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                auto_decompress=False,
+            )
+            self._service = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                transport=AioHttpTransport(session=self._session, session_owner=False),
+            )
+        return self._service
+
+    async def container_client(self, container: str) -> ContainerClient:
+        """Return a cached client for ``container`` sharing the service's connections."""
+        client = self._containers.get(container)
+        if client is None:
+            client = (await self.service_client()).get_container_client(container)
+            self._containers[container] = client
+        return client
+
+    async def blob_client(self, path: str) -> BlobClient:
+        """Return a client for the 'container/blob' ``path`` sharing the service's connections."""
+        container, blob = path.split("/", maxsplit=1)
+        return (await self.container_client(container)).get_blob_client(blob)
+
+    async def _async_fs(self):
+        """Return the shared async adlfs filesystem, on the same connections as the rest."""
+        if self._fs is None:
+            import fsspec
+
+            # only its coroutine methods are used, but it's made in sync mode since
+            # adlfs closes its client from a finalizer that needs fsspec's loop
+            fs = fsspec.filesystem(
+                self.fsspec_protocol,
+                connection_string=self.connection_string,
+                skip_instance_cache=True,
+            )
+            # the client adlfs made hasn't opened a session yet, so it's just dropped.
+            # Closing ours from the finalizer is harmless, it doesn't own the session
+            fs.service_client = await self.service_client()
+            self._fs = fs
+        return self._fs
 
     async def get_blob_properties(self, path, **kwargs: Any) -> BlobProperties:
         r"""
@@ -164,13 +288,7 @@ class async_abfs:
 
             md5 is at .content_settings.content_md5.hex()
         """
-        from azure.storage.blob.aio import BlobClient
-
-        async with (
-            BlobClient.from_connection_string(
-                self.connection_string, *(path.split("/", maxsplit=1))
-            ) as target,
-        ):
+        async with await self.blob_client(path) as target:
             return await target.get_blob_properties(**kwargs)
 
     def pq_unique_values(self, path: str | list[str], column: str) -> list[str]:
@@ -244,36 +362,477 @@ class async_abfs:
 
         if isinstance(path, str):
             path = [path]
-        unique_items = {}
-        for p in path:
-            if len(splt := p.split(":")) > 1:
-                p = splt[1]
-            pq_file = pq.ParquetFile(p, filesystem=self.sync)
-            n_groups = pq_file.num_row_groups
-            try:
-                col_indx = next(
-                    i for i, name in enumerate(pq_file.schema.names) if name == column
+        stripped = [splt[1] if len(splt := p.split(":")) > 1 else p for p in path]
+        return _unique_items(
+            ((p, pq.ParquetFile(p, filesystem=self.sync).metadata) for p in stripped),
+            column,
+            multiple=len(path) > 1,
+        )
+
+    async def pq_metadata(
+        self,
+        path: str | list[str],
+        *,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
+    ) -> list[FileMetaData]:
+        """
+        Fetch the parquet footers of one or more blobs concurrently.
+
+        Each footer is read with a range GET of the last 64 KiB of the file, and a
+        second one for the rest when the footer turns out to be bigger. Parsed
+        footers are cached by path and ETag, so an unchanged file only costs the
+        properties lookup that gets its ETag.
+
+        Parameters
+        ----------
+        path : str | list[str]
+            'container/blob' paths, with or without a protocol prefix.
+        max_concurrency : int, default=8
+            Most files being fetched at once.
+
+        Returns
+        -------
+        list[FileMetaData]
+            The footer of each path, in the same order.
+        """
+        paths = [path] if isinstance(path, str) else path
+        if max_concurrency < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(p: str) -> FileMetaData:
+            async with slots:
+                metadata, _ = await self._pq_footer(_blob_path(p))
+            return metadata
+
+        return list(await asyncio.gather(*(fetch(p) for p in paths)))
+
+    async def _pq_footer(
+        self, path: str, props: BlobProperties | None = None
+    ) -> tuple[FileMetaData, BlobProperties]:
+        """
+        Return the footer of ``path`` and the properties of the version it's from.
+
+        ``props`` saves looking them up when they're already known.
+        """
+        try:
+            import pyarrow as pa
+            from pyarrow import parquet as pq
+        except ImportError as e:
+            msg = "pyarrow is not installed, run `pip install pyarrow` to use this functionality"
+            raise ImportError(msg) from e
+        from azure.core import MatchConditions
+
+        async with await self.blob_client(path) as blob:
+            if props is None:
+                props = await blob.get_blob_properties()
+            key = (self._cache_key(path), props.etag)
+            if (metadata := _pq_metadata_cache.get(key)) is not None:
+                _pq_metadata_cache.move_to_end(key)
+                return metadata, props
+            # every range has to come from the version the etag was read from
+            conditions = {
+                "etag": props.etag,
+                "match_condition": MatchConditions.IfNotModified,
+            }
+            start = max(props.size - PQ_FOOTER_GUESS, 0)
+            stream = await blob.download_blob(
+                offset=start, length=props.size - start, **conditions
+            )
+            tail = await stream.read()
+            # the file ends with the footer, its 4 byte length and the magic
+            if props.size < 12 or tail[-4:] != b"PAR1":
+                msg = f"'{path}' is not a parquet file"
+                raise ValueError(msg)
+            needed = int.from_bytes(tail[-8:-4], "little") + 8
+            if needed > props.size - 4:
+                msg = f"'{path}' has a corrupt parquet footer length"
+                raise ValueError(msg)
+            if needed > len(tail):
+                stream = await blob.download_blob(
+                    offset=props.size - needed,
+                    length=needed - len(tail),
+                    **conditions,
                 )
-            except StopIteration:
+                tail = await stream.read() + tail
+        # read_metadata works from the end, anything before the footer is ignored
+        metadata = pq.read_metadata(pa.BufferReader(tail))
+        _pq_metadata_cache[key] = metadata
+        while len(_pq_metadata_cache) > PQ_METADATA_CACHE_SIZE:
+            _pq_metadata_cache.popitem(last=False)
+        return metadata, props
+
+    async def pq_unique_items_async(
+        self,
+        path: str | list[str],
+        column: str,
+        *,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
+        dictionary: bool = False,
+    ) -> dict[str, list[int]]:
+        """
+        Map each unique parquet column value to row-group indices, fetching concurrently.
+
+        Same as pq_unique_items but the footers come from pq_metadata, so they're
+        fetched ``max_concurrency`` at a time and cached between calls.
+
+        With ``dictionary``, row groups where min != max don't raise. Their values
+        are read from the dictionary page of the column chunk when every data page
+        uses it (from the chunk's encoding stats, or else by walking the page
+        headers), otherwise only that column chunk is downloaded and decoded. A
+        row group then appears under each of its values.
+
+        Parameters
+        ----------
+        path : str | list[str]
+            'container/blob' paths, with or without a protocol prefix.
+        column : str
+            Column name to inspect.
+        max_concurrency : int, default=8
+            Most files, or pages, being fetched at once.
+        dictionary : bool, default=False
+            Read the values of row groups where min != max instead of raising.
+
+        Returns
+        -------
+        dict[str, list[int]]
+            Keys are unique column values and values are row-group indices where
+            each value appears.
+
+        Raises
+        ------
+        ColumnNotExistError
+            If ``column`` is not present in the parquet schema.
+        MinMaxNotEqualError
+            If any row group has non-constant values for ``column``
+            (``min != max``) and ``dictionary`` is False.
+        """
+        paths = [path] if isinstance(path, str) else path
+        if not dictionary:
+            metadatas = await self.pq_metadata(paths, max_concurrency=max_concurrency)
+            return _unique_items(
+                zip((_blob_path(p) for p in paths), metadatas),
+                column,
+                multiple=len(paths) > 1,
+            )
+        from dean_utils.utils import pq_pages
+
+        if max_concurrency < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def row_group_values(p: str) -> list[list]:
+            async with slots:
+                metadata, props = await self._pq_footer(p)
+            names = metadata.schema.names
+            if column not in names:
                 msg = f"Column '{column}' does not exist in parquet file"
-                raise ColumnNotExistError(msg) from None
-
-            for i in range(n_groups):
-                stats = pq_file.metadata.row_group(i).column(col_indx).statistics
-                if stats.min != stats.max:
-                    msg = (
-                        f"Row group {i} column '{column}' has min {stats.min} != max {stats.max}"
-                        if len(path) == 1
-                        else f"Parquet file '{p}' row group {i} column '{column}' has min {stats.min} != max {stats.max}"
-                    )
-                    raise MinMaxNotEqualError(msg)
-                if stats.min not in unique_items:
-                    unique_items[stats.min] = [i]
+                raise ColumnNotExistError(msg)
+            col_indx = names.index(column)
+            values: list[list] = []
+            todo = []
+            for i in range(metadata.num_row_groups):
+                chunk = metadata.row_group(i).column(col_indx)
+                stats = chunk.statistics
+                if stats is not None and stats.has_min_max and stats.min == stats.max:
+                    values.append([stats.min])
+                elif (
+                    stats is not None
+                    and stats.has_null_count
+                    and stats.null_count == chunk.num_values
+                ):
+                    values.append([None])
                 else:
-                    unique_items[stats.min].append(i)
+                    values.append([])
+                    todo.append(i)
+            if todo:
+                page_stats = pq_pages.encoding_stats(metadata)
+                async with await self.blob_client(p) as blob:
+                    found = await asyncio.gather(
+                        *(
+                            _chunk_distinct(
+                                blob,
+                                slots,
+                                props,
+                                metadata,
+                                i,
+                                col_indx,
+                                page_stats[i][col_indx],
+                            )
+                            for i in todo
+                        )
+                    )
+                for i, distinct in zip(todo, found):
+                    values[i] = distinct
+            return values
 
+        unique_items: dict[Any, list[int]] = {}
+        for file_values in await asyncio.gather(
+            *(row_group_values(_blob_path(p)) for p in paths)
+        ):
+            for i, group_values in enumerate(file_values):
+                for value in group_values:
+                    unique_items.setdefault(value, []).append(i)
         return unique_items
 
+    async def build_pq_index(
+        self,
+        prefix: str,
+        columns: list[str],
+        *,
+        index_path: str | None = None,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
+        write: bool = True,
+    ) -> pl.DataFrame:
+        """
+        Build or update a row-group statistics index of the parquet files under a prefix.
+
+        The index has a row per file and row group with ``file``, ``etag``,
+        ``last_modified``, ``row_group`` and ``num_rows``, and for each of
+        ``columns`` its ``{column}_min``, ``{column}_max`` and
+        ``{column}_null_count``. Statistics missing from a file are null.
+
+        It's kept as a parquet sidecar at ``index_path``. On each call the prefix is
+        listed and only files that are new or whose ETag changed have their footer
+        fetched (through pq_metadata's cache), rows of deleted files are dropped.
+        An existing index without all of ``columns`` is rebuilt from scratch. Names
+        starting with '_' or '.' are skipped, like the sidecar itself.
+
+        Parameters
+        ----------
+        prefix : str
+            'container/directory' to index, every parquet file under it is included.
+        columns : list[str]
+            Columns to collect statistics for.
+        index_path : str | None, default=None
+            Where the sidecar lives, ``{prefix}/_pq_index.parquet`` by default.
+        max_concurrency : int, default=8
+            Most footers being fetched at once.
+        write : bool, default=True
+            Save the updated index to ``index_path``, only when anything changed.
+
+        Returns
+        -------
+        pl.DataFrame
+            The index, ready for pq_index_query.
+        """
+        import polars as pl
+        from azure.core.exceptions import ResourceNotFoundError
+
+        if max_concurrency < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        container, _, blob_prefix = _blob_path(prefix).rstrip("/").partition("/")
+        blob_prefix = f"{blob_prefix}/" if blob_prefix else ""
+        if index_path is None:
+            index_path = f"{container}/{blob_prefix}{PQ_INDEX_NAME}"
+        index_path = _blob_path(index_path)
+        stat_names = [f"{c}_{stat}" for c in columns for stat in _PQ_INDEX_STATS]
+
+        listed: dict[str, BlobProperties] = {}
+        container_client = await self.container_client(container)
+        async for props in container_client.list_blobs(name_starts_with=blob_prefix):
+            path = f"{container}/{props.name}"
+            basename = props.name.rsplit("/", 1)[-1]
+            if (
+                path != index_path
+                and basename.endswith(".parquet")
+                and not basename.startswith(("_", "."))
+            ):
+                listed[path] = props
+
+        try:
+            old = pl.read_parquet(await self.read(index_path))
+        except ResourceNotFoundError:
+            old = None
+        if old is not None and not set(stat_names).issubset(old.columns):
+            old = None
+        current = pl.DataFrame(
+            {"file": list(listed), "etag": [p.etag for p in listed.values()]},
+            schema={"file": pl.String, "etag": pl.String},
+        )
+        kept = (
+            None if old is None else old.join(current, on=["file", "etag"], how="semi")
+        )
+        have = set() if kept is None else set(kept["file"].unique())
+        todo = [path for path in listed if path not in have]
+
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def index_file(path: str) -> pl.DataFrame:
+            async with slots:
+                metadata, _ = await self._pq_footer(path, listed[path])
+            return _pq_index_rows(path, listed[path], metadata, columns)
+
+        new = await asyncio.gather(*(index_file(path) for path in todo))
+        frames = ([] if kept is None else [kept]) + list(new)
+        if frames:
+            index = pl.concat(frames, how="diagonal_relaxed")
+        else:
+            index = pl.DataFrame(
+                schema={
+                    "file": pl.String,
+                    "etag": pl.String,
+                    "last_modified": pl.Datetime("us", "UTC"),
+                    "row_group": pl.Int32,
+                    "num_rows": pl.Int64,
+                    **dict.fromkeys(stat_names, pl.Null),
+                }
+            )
+        index = index.select(*_PQ_INDEX_KEYS, *stat_names).sort("file", "row_group")
+        changed = old is None or bool(todo) or kept.height != old.height
+        if write and changed:
+            buf = io.BytesIO()
+            index.write_parquet(buf)
+            async with await self.blob_client(index_path) as target:
+                await target.upload_blob(buf.getvalue(), overwrite=True)
+        return index
+
+    @staticmethod
+    def pq_index_query(
+        index: pl.DataFrame, predicate: pl.Expr
+    ) -> list[tuple[str, int]]:
+        """
+        Return the (file, row_group) pairs of a build_pq_index index that may match.
+
+        ``predicate`` is written against the statistics columns. A row group is
+        only skipped when the predicate is false, where it's null because of
+        missing statistics the row group is kept, since it can't be ruled out.
+
+        Parameters
+        ----------
+        index : pl.DataFrame
+            Index from build_pq_index.
+        predicate : pl.Expr
+            Condition on the row group statistics, for example rows with a
+            ``price`` between 10 and 20 are only in row groups where
+            ``(pl.col("price_max") >= 10) & (pl.col("price_min") <= 20)``.
+
+        Returns
+        -------
+        list[tuple[str, int]]
+            Files and row group indices to read, ordered by file and row group.
+        """
+        matched = index.filter(predicate.fill_null(True)).select("file", "row_group")
+        return list(matched.iter_rows())
+
+    async def read_row_groups(
+        self,
+        path: str | list[str],
+        column: str,
+        values: list,
+        *,
+        columns: list[str] | None = None,
+        include_file_paths: str | None = None,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
+    ) -> pl.DataFrame:
+        """
+        Read the rows of parquet files where ``column`` is one of ``values``.
+
+        Footers are fetched and cached as by pq_metadata. Row groups whose
+        ``column`` statistics can't hold any of ``values`` are skipped, as
+        pq_unique_items would. Only the column chunks of the remaining row groups
+        are downloaded, with range GETs that merge chunks less than 64 KiB apart,
+        ``max_concurrency`` at a time across all files. Those bytes are decoded by
+        pyarrow without the rest of the file and filtered down to the matching rows.
+
+        Parameters
+        ----------
+        path : str | list[str]
+            'container/blob' paths, with or without a protocol prefix.
+        column : str
+            Column to look the values up in.
+        values : list
+            Values to keep rows for, cast to the column's type. None keeps the
+            rows where ``column`` is null.
+        columns : list[str] | None, default=None
+            Columns to return, all of them by default.
+        include_file_paths : str | None, default=None
+            Name of a column to add with the path each row came from.
+        max_concurrency : int, default=8
+            Most range GETs in flight at once.
+
+        Returns
+        -------
+        pl.DataFrame
+            The matching rows of every file, in file and row group order.
+
+        Raises
+        ------
+        ColumnNotExistError
+            If ``column`` is not present in a file's parquet schema.
+        TypeError
+            If any of ``values`` can't be cast to the column's type.
+        """
+        import polars as pl
+
+        paths = [_blob_path(p) for p in ([path] if isinstance(path, str) else path)]
+        if max_concurrency < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def read_file(p: str) -> pl.DataFrame:
+            async with slots:
+                metadata, props = await self._pq_footer(p)
+            names = metadata.schema.names
+            if column not in names:
+                msg = f"Column '{column}' does not exist in parquet file '{p}'"
+                raise ColumnNotExistError(msg)
+            col_indx = names.index(column)
+            arrow_schema = metadata.schema.to_arrow_schema()
+            dtype = pl.from_arrow(arrow_schema.empty_table().select([column])).dtypes[0]
+            # values of the column's own type compare with its statistics and is_in
+            lookup, with_null = _lookup_values(values, dtype, column)
+            stat_values = [*lookup.to_list(), *([None] if with_null else [])]
+            groups = [
+                i
+                for i in range(metadata.num_row_groups)
+                if _row_group_may_hold(
+                    metadata.row_group(i).column(col_indx), stat_values
+                )
+            ]
+            read_columns = (
+                None if columns is None else list(dict.fromkeys([*columns, column]))
+            )
+            if groups:
+                ranges = _chunk_ranges(metadata, groups, read_columns)
+                # the etag the footer came with, so the chunks are from the same file
+                async with await self.blob_client(p) as blob:
+                    fetched = await asyncio.gather(
+                        *(
+                            _fetch_range(blob, slots, props.etag, start, stop)
+                            for start, stop in ranges
+                        )
+                    )
+                source = _RangeFile(
+                    props.size,
+                    [(start, data) for (start, _), data in zip(ranges, fetched)],
+                )
+                table = await asyncio.to_thread(
+                    _read_groups, source, metadata, groups, read_columns
+                )
+            else:
+                table = arrow_schema.empty_table()
+                if read_columns is not None:
+                    table = table.select(read_columns)
+            frame = cast("pl.DataFrame", pl.from_arrow(table))
+            keep = pl.col(column).is_in(lookup)
+            if with_null:
+                # is_in never matches nulls
+                keep = keep | pl.col(column).is_null()
+            frame = frame.filter(keep)
+            if columns is not None:
+                frame = frame.select(columns)
+            if include_file_paths is not None:
+                frame = frame.with_columns(pl.lit(p).alias(include_file_paths))
+            return frame
+
+        frames = await asyncio.gather(*(read_file(p) for p in paths))
+        return pl.concat(frames, how="vertical_relaxed")
+
     async def from_url(
         self,
         source_url: str,
@@ -454,13 +1013,7 @@ class async_abfs:
         -------
                 dict[str, str | datetime]: _description_
         """
-        from azure.storage.blob.aio import BlobClient
-
-        async with (
-            BlobClient.from_connection_string(
-                self.connection_string, *(path.split("/", maxsplit=1))
-            ) as target,
-        ):
+        async with await self.blob_client(path) as target:
             return await target.start_copy_from_url(
                 source_url, metadata, incremental_copy=incremental_copy, **kwargs
             )
@@ -473,6 +1026,9 @@ class async_abfs:
         path: str,
         /,
         recurs=False,
+        *,
+        block_size: int = STREAM_BLOCK_SIZE,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
         **httpx_extras,
     ) -> None:
         """
@@ -481,6 +1037,10 @@ class async_abfs:
         async stream_dl(client, method, url, path, recurs, **httpx_extras)
             Download file streaming in chunks in async as downloader and to a Blob
 
+            At most max_concurrency blocks are staged at once. When they're all
+            in flight the response isn't read any further until one finishes, so
+            memory stays around block_size * max_concurrency whatever the file size.
+
         Args:
             client: httpx.AsyncClient
                 The httpx Async Client object to use
@@ -492,44 +1052,55 @@ class async_abfs:
                 The full path to Azure file being saved
             recurs:
                 To try again recursively
+            block_size:
+                Bytes collected from the response per staged block, 4 MiB by default
+            max_concurrency:
+                Most blocks being staged at the same time, 8 by default
             httpx_extras
                 Any extra arguments to be sent to client.stream
         """
-        from azure.storage.blob.aio import BlobClient
-
         async with (
-            BlobClient.from_connection_string(
-                self.connection_string, *(path.split("/", maxsplit=1))
-            ) as target,
+            await self.blob_client(path) as target,
             client.stream(method, url, **httpx_extras) as resp,
         ):
             resp.raise_for_status()
             block_list = []
-            tasks = set()
+            window = _BlockWindow(max_concurrency)
             accum = bytearray()
-            async for chunk in resp.aiter_bytes():
-                accum.extend(chunk)
-                if len(accum) >= 256000:
-                    _block_task(tasks, target, block_list, bytes(accum))
-                    accum = bytearray()
-            if len(accum) > 0:
-                _block_task(tasks, target, block_list, bytes(accum))
-            await asyncio.wait(tasks)
+            try:
+                async for chunk in resp.aiter_bytes():
+                    accum.extend(chunk)
+                    if len(accum) >= block_size:
+                        await _block_task(window, target, block_list, bytes(accum))
+                        accum = bytearray()
+                if len(accum) > 0:
+                    await _block_task(window, target, block_list, bytes(accum))
+                await window.drain()
+            finally:
+                await window.cancel()
             await target.commit_block_list(block_list)
 
     async def stream_up(
         self,
         local_path: str | Path,
         remote_path: str,
-        size: int = 16384,
+        size: int | None = None,
         /,
         recurs=False,
+        *,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
+        verify: bool = False,
     ) -> None:
         """
         Help on method stream_up.
 
         async stream_up(local_path, remote_path, size, recurs)
-            Download file streaming in chunks in async as downloader and to a Blob
+            Upload a local file to a Blob in blocks staged concurrently
+
+            Blocks are read with readinto into at most max_concurrency reused
+            buffers and staged from them without copying, then committed once.
+            Block ids are the block's index, so the committed block list can be
+            checked against the file.
 
         Args:
             local_path:
@@ -537,47 +1108,87 @@ class async_abfs:
             remote_path:
                 The full path to remote path as str
             size:
-                The number of bytes read per iteration in read
+                The number of bytes per block. None picks one from the file size,
+                between 4 MiB and 100 MiB
             recurs:
                 To try again recursively
+            max_concurrency:
+                Most blocks being staged (and buffers held) at the same time,
+                8 by default
+            verify:
+                After committing, check the blob's block list has every block at
+                the size that was read
         """
         if isinstance(local_path, str):
             local_path = Path(local_path)
         from azure.core.exceptions import HttpResponseError
         from azure.storage.blob import BlobBlock
-        from azure.storage.blob.aio import BlobClient
+
+        file_size = local_path.stat().st_size
+        if size is None:
+            size = _upload_block_size(file_size)
+        if -(-file_size // size) > MAX_BLOCKS:
+            msg = f"{file_size} bytes in blocks of {size} is more than {MAX_BLOCKS} blocks"
+            raise ValueError(msg)
 
         with local_path.open("rb") as src:
-            async with BlobClient.from_connection_string(
-                self.connection_string, *(remote_path.split("/", maxsplit=1))
-            ) as target:
-                block_list = []
-                while True:
-                    chunk = src.read(size)
-                    chunk = cast("IO", chunk)
-                    if not chunk:
-                        break
-                    block_id = uuid4().hex
+            async with await self.blob_client(remote_path) as target:
+                window = _BlockWindow(max_concurrency)
+                free: list[bytearray] = []
+                block_sizes: list[int] = []
+
+                async def stage(block_id: str, buf: bytearray, n: int):
                     try:
-                        await target.stage_block(block_id=block_id, data=chunk)
-                    except HttpResponseError as err:
-                        if "The specified blob or block content is invalid." not in str(
-                            err
-                        ):
-                            raise
-                        await asyncio.sleep(1)
-                        await target.commit_block_list([])
-                        await target.delete_blob()
-                        if recurs is False:
-                            await self.stream_up(
-                                local_path,
-                                remote_path,
-                                recurs=True,
-                            )
-                        else:
-                            raise
-                    block_list.append(BlobBlock(block_id=block_id))
-                await target.commit_block_list(block_list)
+                        await target.stage_block(
+                            block_id=block_id, data=memoryview(buf)[:n]
+                        )
+                    finally:
+                        free.append(buf)
+
+                try:
+                    while True:
+                        await window.reserve()
+                        buf = free.pop() if free else bytearray(size)
+                        n = await asyncio.to_thread(src.readinto, buf)
+                        if not n:
+                            free.append(buf)
+                            window.unreserve()
+                            break
+                        window.start(stage(_block_id(len(block_sizes)), buf, n))
+                        block_sizes.append(n)
+                    await window.drain()
+                except HttpResponseError as err:
+                    # stages still in flight would race the cleanup below
+                    await window.cancel()
+                    if "The specified blob or block content is invalid." not in str(
+                        err
+                    ):
+                        raise
+                    await asyncio.sleep(1)
+                    await target.commit_block_list([])
+                    await target.delete_blob()
+                    if recurs is False:
+                        await self.stream_up(
+                            local_path,
+                            remote_path,
+                            size,
+                            recurs=True,
+                            max_concurrency=max_concurrency,
+                            verify=verify,
+                        )
+                        return
+                    raise
+                finally:
+                    await window.cancel()
+                await target.commit_block_list(
+                    [BlobBlock(block_id=_block_id(i)) for i in range(len(block_sizes))]
+                )
+                if verify:
+                    committed, _ = await target.get_block_list("committed")
+                    expected = [(_block_id(i), n) for i, n in enumerate(block_sizes)]
+                    if [(b.id, b.size) for b in committed] != expected:
+                        msg = f"committed blocks of {remote_path} don't match {local_path}"
+                        raise ValueError(msg)
 
     async def walk(self, path: str, maxdepth=None, **kwargs):
         """
@@ -603,13 +1214,7 @@ class async_abfs:
             kwargs:
                 dict of args passed to ``ls``
         """
-        import fsspec
-
-        this_fs = fsspec.filesystem(
-            self.fsspec_protocol,
-            connection_string=self.connection_string,
-            asyncronous=True,
-        )
+        this_fs = await self._async_fs()
         return [x async for x in this_fs._async_walk(path, maxdepth, **kwargs)]
 
     async def exists(self, path: str):
@@ -619,13 +1224,7 @@ class async_abfs:
         async _exists(path) method of adlfs.spec.AzureBlobFileSystem instance
             Is there a file at the given path
         """
-        import fsspec
-
-        this_fs = fsspec.filesystem(
-            self.fsspec_protocol,
-            connection_string=self.connection_string,
-            asyncronous=True,
-        )
+        this_fs = await self._async_fs()
         return await this_fs._exists(path)
 
     async def details(
@@ -666,13 +1265,7 @@ class async_abfs:
             list of dicts
                 Returns details about the contents, such as name, size and type
         """
-        import fsspec
-
-        this_fs = fsspec.filesystem(
-            self.fsspec_protocol,
-            connection_string=self.connection_string,
-            asyncronous=True,
-        )
+        this_fs = await self._async_fs()
         return await this_fs._details(
             contents,
             delimiter=delimiter,
@@ -702,13 +1295,7 @@ class async_abfs:
         :param overwrite: Boolean (True). Whether to overwrite any existing file
             (True) or raise if one already exists (False).
         """
-        import fsspec
-
-        this_fs = fsspec.filesystem(
-            self.fsspec_protocol,
-            connection_string=self.connection_string,
-            asyncronous=True,
-        )
+        this_fs = await self._async_fs()
         return await this_fs._put_file(
             lpath,
             rpath=rpath,
@@ -755,13 +1342,7 @@ class async_abfs:
 
             return_glob: bool
         """
-        import fsspec
-
-        this_fs = fsspec.filesystem(
-            self.fsspec_protocol,
-            connection_string=self.connection_string,
-            asyncronous=True,
-        )
+        this_fs = await self._async_fs()
         return await this_fs._ls(
             path,
             detail=detail,
@@ -804,13 +1385,7 @@ class async_abfs:
             If False, `self._expand_path` call will be skipped. This is more
             efficient when you don't need the operation.
         """
-        import fsspec
-
-        this_fs = fsspec.filesystem(
-            self.fsspec_protocol,
-            connection_string=self.connection_string,
-            asyncronous=True,
-        )
+        this_fs = await self._async_fs()
         return await this_fs._rm(
             path=path,
             recursive=recursive,
@@ -857,24 +1432,165 @@ class async_abfs:
         return f"https://{account_dict['AccountName']}.blob.core.windows.net/{filepath}?{sas}"
 
     async def stream_read(self, path: str) -> AsyncGenerator[bytes]:
-        from azure.storage.blob.aio import BlobClient
+        async with await self.blob_client(path) as blob:
+            if self.cache is None:
+                stream = await blob.download_blob()
+                async for chunk in stream.chunks():
+                    yield chunk
+                return
+            key = self._cache_key(path)
+            found = await self.cache._lookup(blob, key)
+            if isinstance(found, bytes):
+                yield found
+            elif isinstance(found, io.BufferedReader):
+                with found:
+                    while chunk := await asyncio.to_thread(
+                        found.read, STREAM_BLOCK_SIZE
+                    ):
+                        yield chunk
+            else:
+                tee = self.cache._tee(key, found)
+                try:
+                    async for chunk in tee:
+                        yield chunk
+                finally:
+                    # so stopping early drops the partial file now, not at gc
+                    await tee.aclose()
+
+    async def read(
+        self,
+        path: str,
+        *,
+        max_concurrency: int | None = None,
+        into: bytearray | memoryview | None = None,
+        chunk_size: int = READ_CHUNK_SIZE,
+    ) -> bytes | bytearray | memoryview:
+        """
+        Help on method read.
 
-        async with BlobClient.from_connection_string(
-            self.connection_string, *(path.split("/", maxsplit=1))
-        ) as blob:
-            stream = await blob.download_blob()
+        async read(path, *, max_concurrency, into, chunk_size)
+            Download a Blob into memory
 
-            async for chunk in stream.chunks():
-                yield chunk
+            By default the blob is downloaded as one stream and returned as bytes.
+            With max_concurrency or into, its size is looked up once and it is
+            fetched as chunk_size range GETs, max_concurrency at a time, each
+            written straight to its place in a buffer instead of being joined
+            afterwards. Every range is conditional on the first ETag, so a blob
+            that changes midway raises instead of coming back mixed. Only the
+            default mode goes through the cache.
 
-    async def read(self, path: str) -> bytes:
-        from azure.storage.blob.aio import BlobClient
+        Args:
+            path:
+                The full path to the Azure file to read
+            max_concurrency:
+                Most range GETs in flight at once, 8 when only into is given
+            into:
+                Writable buffer at least as long as the blob to download into, a
+                memoryview of the part filled is returned. Without it a bytearray
+                of the blob's size is allocated and returned
+            chunk_size:
+                Bytes per range GET, 8 MiB by default
+        """
+        async with await self.blob_client(path) as blob:
+            if max_concurrency is None and into is None:
+                if self.cache is not None:
+                    return await self._read_cached(blob, path)
+                stream = await blob.download_blob()
+                return await stream.read()
+            props = await blob.get_blob_properties()
+            allocated = into is None
+            if into is None:
+                into = bytearray(props.size)
+            view = memoryview(into).cast("B")
+            if view.readonly:
+                msg = "into must be a writable buffer"
+                raise ValueError(msg)
+            if len(view) < props.size:
+                msg = f"into holds {len(view)} bytes but {path} is {props.size} bytes"
+                raise ValueError(msg)
+            view = view[: props.size]
+            await _download_ranges(
+                blob,
+                view,
+                props.etag,
+                chunk_size=chunk_size,
+                max_concurrency=max_concurrency or STREAM_MAX_CONCURRENCY,
+            )
+            return into if allocated else view
+
+    def _cache_key(self, path: str) -> str:
+        # the account keeps paths of different accounts apart in a shared directory
+        return f"{self.stor.get('account_name') or self.connection_string}/{path}"
+
+    async def _read_cached(self, blob: BlobClient, path: str) -> bytes:
+        cache = cast("BlobCache", self.cache)
+        key = self._cache_key(path)
+        found = await cache._lookup(blob, key)
+        if isinstance(found, bytes):
+            return found
+        if isinstance(found, io.BufferedReader):
+            with found:
+                data = await asyncio.to_thread(found.read)
+            cache._remember(key, data)
+            return data
+        data = await found.read()
+        await cache._put(key, found.properties.etag, data)
+        return data
+
+    async def download_to(
+        self,
+        path: str,
+        local_path: str | Path,
+        *,
+        max_concurrency: int = STREAM_MAX_CONCURRENCY,
+        chunk_size: int = READ_CHUNK_SIZE,
+    ) -> int:
+        """
+        Help on method download_to.
+
+        async download_to(path, local_path, *, max_concurrency, chunk_size)
+            Download a Blob to a local file with concurrent range GETs
 
-        async with BlobClient.from_connection_string(
-            self.connection_string, *(path.split("/", maxsplit=1))
-        ) as blob:
-            stream = await blob.download_blob()
-            return await stream.read()
+            The file is sized up front and memory mapped, and every range is
+            written straight into the mapping, so nothing but the ranges in
+            flight is held in memory. An existing file is overwritten, a failed
+            download leaves no file behind. Returns the number of bytes downloaded.
+
+        Args:
+            path:
+                The full path to the Azure file to download
+            local_path:
+                The full path to the local file as str or Path
+            max_concurrency:
+                Most range GETs in flight at once, 8 by default
+            chunk_size:
+                Bytes per range GET, 8 MiB by default
+        """
+        import mmap
+
+        if isinstance(local_path, str):
+            local_path = Path(local_path)
+        async with await self.blob_client(path) as blob:
+            props = await blob.get_blob_properties()
+            try:
+                with local_path.open("wb+") as dst:
+                    dst.truncate(props.size)
+                    if props.size > 0:
+                        with (
+                            mmap.mmap(dst.fileno(), props.size) as mapped,
+                            memoryview(mapped) as view,
+                        ):
+                            await _download_ranges(
+                                blob,
+                                view,
+                                props.etag,
+                                chunk_size=chunk_size,
+                                max_concurrency=max_concurrency,
+                            )
+            except BaseException:
+                local_path.unlink(missing_ok=True)
+                raise
+        return props.size
 
     async def lock(self, lock_path: str, timeout_sec: int = 0) -> Lock:
         return Lock(self.connection_string, lock_path, timeout_sec)
@@ -896,23 +1612,643 @@ class async_abfs:
         return loads(data)
 
 
+def _blob_path(path: str) -> str:
+    """Return 'container/blob' from a path that may have a protocol prefix."""
+    return path.split("://", 1)[-1].lstrip("/")
+
+
+def _lookup_values(
+    values: list, dtype: pl.DataType, column: str
+) -> tuple[pl.Series, bool]:
+    """Return ``values`` without None cast to ``dtype`` and whether None was in them."""
+    import polars as pl
+
+    given = pl.Series(column, [v for v in values if v is not None], strict=False)
+    lookup = given.cast(dtype, strict=False)
+    if lookup.null_count() > 0:
+        bad = given.filter(lookup.is_null()).head(5).to_list()
+        msg = f"values {bad} can't be cast to {column}'s type {dtype}"
+        raise TypeError(msg)
+    return lookup, len(given) < len(values)
+
+
+def _row_group_may_hold(chunk: Any, values: list) -> bool:
+    """Whether a column chunk's statistics allow any of ``values`` in it."""
+    stats = chunk.statistics
+    if stats is None or not stats.has_min_max:
+        return True
+    try:
+        in_range = any(v is not None and stats.min <= v <= stats.max for v in values)
+    except TypeError:
+        # values that don't compare with the statistics (naive vs aware datetimes,
+        # date vs datetime, str vs bytes...) can't rule the row group out
+        return True
+    return in_range or (
+        None in values and (not stats.has_null_count or stats.null_count > 0)
+    )
+
+
+def _chunk_ranges(
+    metadata: FileMetaData, groups: list[int], columns: list[str] | None
+) -> list[tuple[int, int]]:
+    """Return the merged (start, stop) byte ranges of the column chunks to read."""
+    chunks = []
+    for i in groups:
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if (
+                columns is not None
+                and chunk.path_in_schema.split(".")[0] not in columns
+            ):
+                continue
+            start = chunk.data_page_offset
+            # some writers put 0 here instead of leaving it unset
+            if chunk.has_dictionary_page and chunk.dictionary_page_offset > 0:
+                start = min(start, chunk.dictionary_page_offset)
+            chunks.append((start, start + chunk.total_compressed_size))
+    merged: list[tuple[int, int]] = []
+    for start, stop in sorted(chunks):
+        if merged and start - merged[-1][1] <= PQ_RANGE_GAP:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+async def _fetch_range(
+    blob: BlobClient, slots: asyncio.Semaphore, etag: str, start: int, stop: int
+) -> bytes:
+    from azure.core import MatchConditions
+
+    async with slots:
+        stream = await blob.download_blob(
+            offset=start,
+            length=stop - start,
+            etag=etag,
+            match_condition=MatchConditions.IfNotModified,
+        )
+        return await stream.read()
+
+
+async def _chunk_distinct(
+    blob: BlobClient,
+    slots: asyncio.Semaphore,
+    props: BlobProperties,
+    metadata: FileMetaData,
+    row_group: int,
+    col_indx: int,
+    page_stats: list | None,
+) -> list:
+    """Return the distinct values of a column chunk, from its dictionary page if possible."""
+    from dean_utils.utils import pq_pages
+
+    chunk = metadata.row_group(row_group).column(col_indx)
+    name = chunk.path_in_schema.split(".")[0]
+    only = pq_pages.dictionary_only(chunk, page_stats)
+    if only is not False:
+        start = chunk.dictionary_page_offset
+        chunk_end = start + chunk.total_compressed_size
+        # the first data page header comes along in case the pages need checking
+        data = await _fetch_range(
+            blob,
+            slots,
+            props.etag,
+            start,
+            min(chunk.data_page_offset + PQ_PAGE_HEADER_GUESS, chunk_end),
+        )
+        if only is None:
+            only = await _dictionary_encoded_pages(
+                blob, slots, props.etag, chunk, data, chunk_end
+            )
+        schema = metadata.schema.to_arrow_schema()
+        if only and name in schema.names:
+            values = pq_pages.decode_dictionary_page(
+                data,
+                chunk,
+                metadata.schema.column(col_indx).length or 0,
+                schema.field(name).type,
+            )
+            if values is not None:
+                return values
+
+    ranges = _chunk_ranges(metadata, [row_group], [name])
+    fetched = await asyncio.gather(
+        *(_fetch_range(blob, slots, props.etag, start, stop) for start, stop in ranges)
+    )
+    source = _RangeFile(
+        props.size, [(start, data) for (start, _), data in zip(ranges, fetched)]
+    )
+    table = await asyncio.to_thread(_read_groups, source, metadata, [row_group], [name])
+    return table.column(0).unique().drop_null().to_pylist() or [None]
+
+
+async def _dictionary_encoded_pages(
+    blob: BlobClient,
+    slots: asyncio.Semaphore,
+    etag: str,
+    chunk: Any,
+    data: bytes,
+    chunk_end: int,
+) -> bool:
+    """
+    Walk the data page headers of ``chunk`` checking they're all dictionary encoded.
+
+    ``data`` holds the chunk from its dictionary page on. Headers past it are
+    fetched one at a time, so a chunk with more than PQ_PAGE_WALK_LIMIT pages
+    is given up on.
+    """
+    from dean_utils.utils import pq_pages
+
+    start = chunk.dictionary_page_offset
+    pos = chunk.data_page_offset
+    for _ in range(PQ_PAGE_WALK_LIMIT):
+        if pos >= chunk_end:
+            return True
+        try:
+            header, header_end = pq_pages.read_page_header(data, pos - start)
+        except IndexError:
+            start = pos
+            data = await _fetch_range(
+                blob, slots, etag, pos, min(pos + PQ_PAGE_HEADER_GUESS, chunk_end)
+            )
+            try:
+                header, header_end = pq_pages.read_page_header(data)
+            except IndexError:
+                return False
+        encoding = pq_pages.page_encoding(header)
+        if encoding is not None and encoding not in pq_pages.DICTIONARY_ENCODINGS:
+            return False
+        pos = start + header_end + header[3]
+    return False
+
+
+def _read_groups(
+    source: _RangeFile,
+    metadata: FileMetaData,
+    groups: list[int],
+    columns: list[str] | None,
+) -> Any:
+    from pyarrow import parquet as pq
+
+    # with the footer given, pyarrow only reads the column chunks
+    return pq.ParquetFile(source, metadata=metadata).read_row_groups(
+        groups, columns=columns
+    )
+
+
+class _RangeFile(io.RawIOBase):
+    """Read-only file of ``size`` bytes where only the fetched ranges can be read."""
+
+    def __init__(self, size: int, ranges: list[tuple[int, bytes]]):
+        self.size = size
+        self.ranges = sorted(ranges, key=lambda r: r[0])
+        self.starts = [start for start, _ in self.ranges]
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = offset
+        return self.pos
+
+    def readinto(self, buffer: Any) -> int:
+        n = min(len(buffer), self.size - self.pos)
+        if n <= 0:
+            return 0
+        i = bisect_right(self.starts, self.pos) - 1
+        if i >= 0:
+            start, data = self.ranges[i]
+            if self.pos + n <= start + len(data):
+                offset = self.pos - start
+                buffer[:n] = memoryview(data)[offset : offset + n]
+                self.pos += n
+                return n
+        msg = f"bytes {self.pos} to {self.pos + n} weren't fetched"
+        raise ValueError(msg)
+
+
+_PQ_INDEX_KEYS = ["file", "etag", "last_modified", "row_group", "num_rows"]
+_PQ_INDEX_STATS = ("min", "max", "null_count")
+
+
+def _pq_index_rows(
+    path: str, props: BlobProperties, metadata: FileMetaData, columns: list[str]
+) -> pl.DataFrame:
+    """Return the build_pq_index rows of one file."""
+    import polars as pl
+
+    names = metadata.schema.names
+    n_groups = metadata.num_row_groups
+    rows: dict[str, list] = {
+        "file": [path] * n_groups,
+        "etag": [props.etag] * n_groups,
+        "last_modified": [props.last_modified] * n_groups,
+        "row_group": list(range(n_groups)),
+        "num_rows": [metadata.row_group(i).num_rows for i in range(n_groups)],
+    }
+    for column in columns:
+        mins, maxes, null_counts = [], [], []
+        col_indx = names.index(column) if column in names else None
+        for i in range(n_groups):
+            stats = (
+                None
+                if col_indx is None
+                else metadata.row_group(i).column(col_indx).statistics
+            )
+            has_min_max = stats is not None and stats.has_min_max
+            mins.append(stats.min if has_min_max else None)
+            maxes.append(stats.max if has_min_max else None)
+            has_nulls = stats is not None and stats.has_null_count
+            null_counts.append(stats.null_count if has_nulls else None)
+        rows[f"{column}_min"] = mins
+        rows[f"{column}_max"] = maxes
+        rows[f"{column}_null_count"] = null_counts
+    return pl.DataFrame(rows, strict=False).with_columns(
+        pl.col("last_modified").cast(pl.Datetime("us", "UTC")),
+        pl.col("row_group").cast(pl.Int32),
+        pl.col("num_rows").cast(pl.Int64),
+        pl.col(f"{c}_null_count" for c in columns).cast(pl.Int64),
+    )
+
+
+def _unique_items(
+    files: Iterable[tuple[str, FileMetaData]], column: str, *, multiple: bool
+) -> dict[Any, list[int]]:
+    """Map the single value of ``column`` in each row group to the row groups with it."""
+    unique_items: dict[Any, list[int]] = {}
+    for p, metadata in files:
+        try:
+            col_indx = metadata.schema.names.index(column)
+        except ValueError:
+            msg = f"Column '{column}' does not exist in parquet file"
+            raise ColumnNotExistError(msg) from None
+
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(col_indx).statistics
+            if stats.min != stats.max:
+                msg = (
+                    f"Parquet file '{p}' row group {i} column '{column}' has min {stats.min} != max {stats.max}"
+                    if multiple
+                    else f"Row group {i} column '{column}' has min {stats.min} != max {stats.max}"
+                )
+                raise MinMaxNotEqualError(msg)
+            if stats.min not in unique_items:
+                unique_items[stats.min] = [i]
+            else:
+                unique_items[stats.min].append(i)
+    return unique_items
+
+
 async def _stage_block(target: BlobClient, block_id: str, chunk: bytes):
     return await target.stage_block(block_id=block_id, data=cast("IO", chunk))
 
 
-def _block_task(
-    tasks: set[asyncio.Task],
+def _block_id(index: int) -> str:
+    # every block of a blob needs an id of the same length
+    return f"block-{index:08d}"
+
+
+def _upload_block_size(file_size: int) -> int:
+    """Block size for stream_up, whole MiB between the upload min and max."""
+    mib = 1024 * 1024
+    size = -(-file_size // 1000 // mib) * mib
+    return min(max(size, UPLOAD_MIN_BLOCK_SIZE), UPLOAD_MAX_BLOCK_SIZE)
+
+
+async def _download_ranges(
+    blob: BlobClient,
+    view: memoryview,
+    etag: str,
+    *,
+    chunk_size: int,
+    max_concurrency: int,
+) -> None:
+    """Fill ``view`` from the start of ``blob`` with concurrent range GETs."""
+    from azure.core import MatchConditions
+
+    if chunk_size < 1:
+        msg = "chunk_size must be at least 1"
+        raise ValueError(msg)
+
+    async def fetch(offset: int, length: int):
+        # released on the way out, even on errors, so an mmap under view can close
+        with view[offset : offset + length] as part:
+            stream = await blob.download_blob(
+                offset=offset,
+                length=length,
+                max_concurrency=1,
+                etag=etag,
+                match_condition=MatchConditions.IfNotModified,
+            )
+            written = await stream.readinto(_ViewWriter(part))
+        if written != length:
+            msg = f"range at {offset} returned {written} bytes instead of {length}"
+            raise ValueError(msg)
+
+    window = _BlockWindow(max_concurrency)
+    try:
+        for offset in range(0, len(view), chunk_size):
+            await window.submit(fetch(offset, min(chunk_size, len(view) - offset)))
+        await window.drain()
+    finally:
+        # the cancelled ones still hold slices of view until they finish
+        await window.cancel()
+
+
+class _ViewWriter:
+    """Write-only file object over a memoryview, for StorageStreamDownloader.readinto."""
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.pos = 0
+
+    def write(self, data: bytes) -> int:
+        n = len(data)
+        if self.pos + n > len(self.view):
+            msg = "range returned more bytes than requested"
+            raise ValueError(msg)
+        self.view[self.pos : self.pos + n] = data
+        self.pos += n
+        return n
+
+
+class _BlockWindow:
+    """At most ``size`` staging tasks in flight, the first failure is kept to re-raise."""
+
+    def __init__(self, size: int):
+        if size < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        self.slots = asyncio.Semaphore(size)
+        self.tasks: set[asyncio.Task] = set()
+        self.error: BaseException | None = None
+
+    async def reserve(self) -> None:
+        """Wait for a free slot and hold it for the next start."""
+        await self.slots.acquire()
+        if self.error is not None:
+            self.slots.release()
+            raise self.error
+
+    def unreserve(self) -> None:
+        self.slots.release()
+
+    def start(self, coro) -> None:
+        """Run ``coro`` in the background in the slot taken by reserve."""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._done)
+
+    async def submit(self, coro) -> None:
+        """Wait for a free slot, then run ``coro`` in the background."""
+        try:
+            await self.reserve()
+        except BaseException:
+            coro.close()
+            raise
+        self.start(coro)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        self.slots.release()
+        if not task.cancelled() and task.exception() is not None and self.error is None:
+            self.error = task.exception()
+
+    async def drain(self) -> None:
+        """Wait for every task, raising the first failure."""
+        if self.tasks:
+            await asyncio.wait(self.tasks)
+        if self.error is not None:
+            raise self.error
+
+    async def cancel(self) -> None:
+        """Cancel every task and wait until they're done, without raising their errors."""
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _block_task(
+    window: _BlockWindow,
     target: BlobClient,
     block_list: list[BlobBlock],
     chunk: bytes,
 ):
+    """Stage ``chunk`` as the next block once ``window`` has room for it."""
     from azure.storage.blob import BlobBlock
 
     block_id = uuid4().hex
-    tasks.add(asyncio.create_task(_stage_block(target, block_id, chunk)))
+    await window.submit(_stage_block(target, block_id, chunk))
     block_list.append(BlobBlock(block_id=block_id))
 
 
+@dataclass
+class _CacheEntry:
+    etag: str
+    size: int
+    # time.monotonic() of the last check against the blob's ETag
+    checked: float
+
+
+class BlobCache:
+    """
+    Size bounded LRU cache of blob bodies on local disk, validated by ETag.
+
+    Give one to ``async_abfs(cache=...)`` and read, read_json and stream_read go
+    through it. A cached blob is downloaded with If-None-Match set to its ETag,
+    so an unchanged blob costs a 304 instead of its body. Within ``ttl`` seconds
+    of the last check it is trusted without asking at all.
+
+    Bodies are files in ``directory`` and the least recently used are deleted
+    once they add up to more than ``max_bytes``. Files left by an earlier
+    process are picked up, and revalidated before they're used. The most
+    recently used bodies up to ``memory_bytes`` are also kept in memory.
+
+    ``hits`` counts reads served locally, ``misses`` reads that downloaded the
+    body and ``evictions`` bodies deleted from disk to make room.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        *,
+        max_bytes: int = CACHE_MAX_BYTES,
+        memory_bytes: int = 0,
+        ttl: float | None = None,
+    ):
+        if directory is None:
+            import tempfile
+
+            directory = Path(tempfile.gettempdir()) / "dean_utils_blob_cache"
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # digest -> entry, least recently used first
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._disk_bytes = 0
+        self._memory_used = 0
+        tags = sorted(self.directory.glob("*.etag"), key=lambda p: p.stat().st_mtime)
+        for tag in tags:
+            body = tag.with_suffix(".bin")
+            if not body.exists():
+                tag.unlink(missing_ok=True)
+                continue
+            size = body.stat().st_size
+            self._entries[tag.stem] = _CacheEntry(tag.read_text(), size, -float("inf"))
+            self._disk_bytes += size
+        self._evict()
+
+    def _digest(self, key: str) -> str:
+        return blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def _paths(self, digest: str) -> tuple[Path, Path]:
+        return self.directory / f"{digest}.bin", self.directory / f"{digest}.etag"
+
+    def _tmp_path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.{uuid4().hex}.tmp"
+
+    async def _lookup(
+        self, blob: BlobClient, key: str
+    ) -> bytes | io.BufferedReader | StorageStreamDownloader:
+        """
+        Return the body of ``blob`` from the cache if it's current, else its download.
+
+        Cached bodies come back as bytes from memory or as their opened file, which
+        stays readable even if another process evicts it meanwhile.
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import HttpResponseError
+
+        digest = self._digest(key)
+        entry = self._entries.get(digest)
+        if entry is not None and (
+            self.ttl is None or time.monotonic() - entry.checked >= self.ttl
+        ):
+            try:
+                stream = await blob.download_blob(
+                    etag=entry.etag, match_condition=MatchConditions.IfModified
+                )
+            except HttpResponseError as err:
+                if err.status_code != 304:
+                    raise
+                entry.checked = time.monotonic()
+            else:
+                self.misses += 1
+                return stream
+        if entry is not None:
+            self._entries.move_to_end(digest)
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                self.hits += 1
+                return data
+            try:
+                found = self._paths(digest)[0].open("rb")
+            except FileNotFoundError:
+                self._forget(digest)
+            else:
+                self.hits += 1
+                return cast("io.BufferedReader", found)
+        self.misses += 1
+        return await blob.download_blob()
+
+    async def _put(self, key: str, etag: str, data: bytes) -> None:
+        """Cache ``data`` as the body of ``key`` at ``etag``."""
+        if len(data) > self.max_bytes:
+            return
+        digest = self._digest(key)
+        tmp = self._tmp_path(digest)
+        await asyncio.to_thread(tmp.write_bytes, data)
+        self._commit(digest, etag, tmp, len(data))
+        self._remember(key, data)
+
+    async def _tee(
+        self, key: str, stream: StorageStreamDownloader
+    ) -> AsyncGenerator[bytes]:
+        """Yield the chunks of ``stream``, caching them once it's read to the end."""
+        digest = self._digest(key)
+        tmp = self._tmp_path(digest)
+        size = 0
+        try:
+            with tmp.open("wb") as dst:
+                async for chunk in stream.chunks():
+                    if size + len(chunk) <= self.max_bytes:
+                        await asyncio.to_thread(dst.write, chunk)
+                    size += len(chunk)
+                    yield chunk
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        if size > self.max_bytes:
+            tmp.unlink(missing_ok=True)
+            return
+        self._commit(digest, stream.properties.etag, tmp, size)
+
+    def _commit(self, digest: str, etag: str, tmp: Path, size: int) -> None:
+        body, tag = self._paths(digest)
+        # body before tag, a reader pairing a new body with the old tag only
+        # downloads again, the other way round it could trust a stale body
+        tmp.replace(body)
+        tag_tmp = self._tmp_path(digest)
+        tag_tmp.write_text(etag)
+        tag_tmp.replace(tag)
+        self._drop(digest)
+        self._entries[digest] = _CacheEntry(etag, size, time.monotonic())
+        self._disk_bytes += size
+        self._evict()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """Keep ``data`` in the memory tier, dropping the least recently used."""
+        if len(data) > self.memory_bytes:
+            return
+        digest = self._digest(key)
+        if digest not in self._entries:
+            return
+        if (old := self._memory.pop(digest, None)) is not None:
+            self._memory_used -= len(old)
+        self._memory[digest] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_used -= len(dropped)
+
+    def _drop(self, digest: str) -> None:
+        """Take ``digest`` out of the index and memory, leaving its files."""
+        if (entry := self._entries.pop(digest, None)) is not None:
+            self._disk_bytes -= entry.size
+        if (data := self._memory.pop(digest, None)) is not None:
+            self._memory_used -= len(data)
+
+    def _forget(self, digest: str) -> None:
+        self._drop(digest)
+        for path in self._paths(digest):
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        while self._disk_bytes > self.max_bytes and self._entries:
+            self._forget(next(iter(self._entries)))
+            self.evictions += 1
+
+
 class MinMaxNotEqualError(Exception):
     pass
 
@@ -1,15 +1,15 @@
 from psycopg.sql import SQL
 
-info_sql = SQL("""
-               SELECT c.column_name,
+_info_columns = SQL("""c.column_name,
     c.is_nullable,
     coalesce(e.data_type, c.data_type) AS data_type,
     c.data_type = 'ARRAY' as is_array,
     case
         when c.data_type = 'USER-DEFINED' then concat(c.udt_schema, '.', c.udt_name)
         else NULL
-    end as user_type
-FROM INFORMATION_SCHEMA.COLUMNS c
+    end as user_type""")
+
+_info_from = SQL("""FROM INFORMATION_SCHEMA.COLUMNS c
     LEFT JOIN information_schema.element_types e ON (
         (
             c.table_catalog,
@@ -24,6 +24,20 @@ FROM INFORMATION_SCHEMA.COLUMNS c
             e.object_type,
             e.collection_type_identifier
         )
-    )
+    )""")
+
+info_sql = SQL("""
+               SELECT {columns}
+{from_}
+WHERE c.table_schema = %s
+    AND c.table_name = %s""").format(columns=_info_columns, from_=_info_from)
+
+# same as info_sql for every table in a schema at once, table_name comes first
+schema_info_sql = SQL("""
+               SELECT c.table_name,
+    {columns}
+{from_}
 WHERE c.table_schema = %s
-    AND c.table_name = %s""")
+ORDER BY c.table_name, c.ordinal_position""").format(
+    columns=_info_columns, from_=_info_from
+)
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    import numpy as np
+    import polars as pl
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + b"\x00\x00\x00\x00" + b"\x00\x00\x00\x00"
+COPY_TRAILER = b"\xff\xff"
+
+# days/microseconds between 1970-01-01 (polars) and 2000-01-01 (postgres)
+PG_EPOCH_DAYS = 10_957
+PG_EPOCH_US = PG_EPOCH_DAYS * 86_400 * 1_000_000
+
+# postgres type -> big endian numpy dtype of its binary representation
+FIXED_WIDTH_TYPES = {
+    "smallint": ">i2",
+    "integer": ">i4",
+    "bigint": ">i8",
+    "real": ">f4",
+    "double precision": ">f8",
+    "boolean": "u1",
+    "date": ">i4",
+    "timestamp with time zone": ">i8",
+    "timestamp without time zone": ">i8",
+}
+TEXT_TYPES = ("text", "character varying")
+
+
+def binary_compatible(pltype: pl.DataType, pg_type: str) -> bool:
+    """
+    Whether a polars dtype can be sent natively as ``pg_type`` in binary COPY.
+
+    Anything that isn't compatible has to be sent as text and cast by postgres.
+    """
+    import polars as pl
+
+    if pg_type in ("smallint", "integer", "bigint"):
+        return pltype.is_integer()
+    if pg_type in ("real", "double precision"):
+        return pltype.is_integer() or pltype.is_float()
+    if pg_type == "boolean":
+        return pltype == pl.Boolean
+    if pg_type == "date":
+        return pltype == pl.Date
+    if pg_type == "timestamp with time zone":
+        return isinstance(pltype, pl.Datetime) and pltype.time_zone is not None
+    if pg_type == "timestamp without time zone":
+        return isinstance(pltype, pl.Datetime) and pltype.time_zone is None
+    if pg_type in TEXT_TYPES:
+        return pltype in (pl.String, pl.Categorical) or isinstance(pltype, pl.Enum)
+    if pg_type == "bytea":
+        # bytea's binary form is the bytes themselves
+        return pltype == pl.Binary
+    return False
+
+
+def _fixed_payload(s: pl.Series, pg_type: str) -> np.ndarray:
+    """Return the non-null-filled physical values of ``s`` as postgres wants them."""
+    import polars as pl
+
+    numeric_types = {
+        "smallint": pl.Int16,
+        "integer": pl.Int32,
+        "bigint": pl.Int64,
+        "real": pl.Float32,
+        "double precision": pl.Float64,
+    }
+    if pg_type == "date":
+        s = s.to_physical().cast(pl.Int32) - PG_EPOCH_DAYS
+    elif pg_type.startswith("timestamp"):
+        s = s.dt.cast_time_unit("us").to_physical() - PG_EPOCH_US
+    elif pg_type == "boolean":
+        s = s.cast(pl.UInt8)
+    else:
+        # strict cast so out of range values raise instead of wrapping
+        s = s.cast(numeric_types[pg_type])
+    # zero fill so to_numpy never has to materialize nulls as floats
+    arr = s.fill_null(0).to_numpy()
+    return arr.astype(FIXED_WIDTH_TYPES[pg_type], copy=False)
+
+
+def _var_payload(s: pl.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Return (offsets, data) of ``s`` straight out of its arrow buffers."""
+    import numpy as np
+    import polars as pl
+    import pyarrow as pa
+
+    if s.dtype != pl.Binary:
+        s = s.cast(pl.String).cast(pl.Binary)
+    arr = s.fill_null(b"").to_arrow()
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    arr = arr.cast(pa.large_binary())
+    _, offsets_buf, data_buf = arr.buffers()
+    offsets = np.frombuffer(offsets_buf, dtype=np.int64)[
+        arr.offset : arr.offset + len(arr) + 1
+    ]
+    if data_buf is None:
+        data = np.empty(0, dtype=np.uint8)
+    else:
+        data = np.frombuffer(data_buf, dtype=np.uint8)
+    return offsets, data
+
+
+def encode_binary_block(
+    df: pl.DataFrame,
+    pg_types: Sequence[str],
+    *,
+    header: bool = False,
+    trailer: bool = False,
+) -> bytes:
+    """
+    Encode a DataFrame into a block of PostgreSQL binary COPY tuples.
+
+    Every column is encoded as a whole with numpy so no python objects are
+    created per row or per cell.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Rows to encode, columns in the same order as the COPY column list.
+    pg_types : Sequence[str]
+        Postgres type of each column of the COPY target. Types that aren't in
+        ``FIXED_WIDTH_TYPES`` are sent as their text bytes, so the column is
+        cast to String first.
+    header : bool, default=False
+        Prepend the COPY signature. Must be set on the first block of a COPY.
+    trailer : bool, default=False
+        Append the COPY trailer. Must be set on the last block of a COPY.
+
+    Returns
+    -------
+    bytes
+        The encoded block, ready for ``Copy.write``.
+    """
+    import numpy as np
+
+    n_rows = df.height
+    n_cols = df.width
+    if len(pg_types) != n_cols:
+        msg = f"got {len(pg_types)} types for {n_cols} columns"
+        raise ValueError(msg)
+
+    # payload length of each field, -1 for null, which is also what goes on the wire
+    field_lens = np.empty((n_cols, n_rows), dtype=np.int64)
+    payloads: list[np.ndarray | tuple[np.ndarray, np.ndarray]] = []
+    for i, (s, pg_type) in enumerate(zip(df.get_columns(), pg_types)):
+        nulls = s.is_null().to_numpy()
+        if pg_type in FIXED_WIDTH_TYPES:
+            values = _fixed_payload(s, pg_type)
+            field_lens[i] = values.dtype.itemsize
+            payloads.append(values)
+        else:
+            offsets, data = _var_payload(s)
+            field_lens[i] = np.diff(offsets)
+            payloads.append((offsets, data))
+        field_lens[i][nulls] = -1
+
+    # every field is a 4 byte length followed by its payload, every row a 2 byte count
+    field_sizes = 4 + np.maximum(field_lens, 0)
+    row_sizes = 2 + field_sizes.sum(axis=0)
+    body_start = len(COPY_SIGNATURE) if header else 0
+    row_starts = np.empty(n_rows, dtype=np.int64)
+    if n_rows > 0:
+        row_starts[0] = body_start
+        np.cumsum(row_sizes[:-1], out=row_starts[1:])
+        row_starts[1:] += body_start
+    total = body_start + int(row_sizes.sum()) + (len(COPY_TRAILER) if trailer else 0)
+
+    out = np.empty(total, dtype=np.uint8)
+    if header:
+        out[:body_start] = np.frombuffer(COPY_SIGNATURE, dtype=np.uint8)
+    if trailer:
+        out[total - len(COPY_TRAILER) :] = np.frombuffer(COPY_TRAILER, dtype=np.uint8)
+
+    count = np.array([n_cols], dtype=">i2").view(np.uint8)
+    out[row_starts[:, None] + np.arange(2)] = count
+    field_starts = row_starts + 2
+    for lens, payload in zip(field_lens, payloads):
+        out[field_starts[:, None] + np.arange(4)] = (
+            lens.astype(">i4").view(np.uint8).reshape(-1, 4)
+        )
+        data_starts = field_starts + 4
+        valid = lens >= 0
+        if isinstance(payload, tuple):
+            offsets, data = payload
+            start, stop = int(offsets[0]), int(offsets[-1])
+            if stop > start:
+                # each byte lands at its row's data start plus its offset within the value
+                shift = data_starts - offsets[:-1]
+                dest = np.repeat(shift, np.diff(offsets)) + np.arange(start, stop)
+                out[dest] = data[start:stop]
+        else:
+            width = payload.dtype.itemsize
+            out[data_starts[valid][:, None] + np.arange(width)] = (
+                payload[valid].view(np.uint8).reshape(-1, width)
+            )
+        field_starts = data_starts + np.maximum(lens, 0)
+    return out.tobytes()
+
+
+def iter_binary_copy(
+    frames: Iterable[pl.DataFrame], pg_types: Sequence[str]
+) -> Iterator[bytes]:
+    """
+    Yield a complete binary COPY stream with one block per frame in ``frames``.
+
+    The first block carries the signature and a final trailer block is always
+    yielded, so the output can be written verbatim with ``Copy.write``. Block
+    size is bounded by the frames, so slice them to the size wanted.
+    """
+    header = True
+    for frame in frames:
+        yield encode_binary_block(frame, pg_types, header=header)
+        header = False
+    if header:
+        yield COPY_SIGNATURE + COPY_TRAILER
+    else:
+        yield COPY_TRAILER
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Sequence
+
+    import polars as pl
+    from psycopg import AsyncConnection
+    from psycopg.sql import Composable
+
+READ_BUFFER_SIZE = 16 * 1024 * 1024
+
+# (dsn, type oid) -> format_type name, the same names info_sql reports as data_type
+_type_name_cache: dict[tuple[str, int], str] = {}
+
+_TYPMOD = re.compile(r"\(.*?\)")
+
+# pl.Decimal is 128 bit, wider numerics are read as Float64
+DECIMAL_MAX_PRECISION = 38
+NUMERIC_SPECIALS = ["NaN", "Infinity", "-Infinity"]
+
+
+def _as_sql(query: str | Composable) -> Composable:
+    from psycopg.sql import SQL
+
+    return SQL(query) if isinstance(query, str) else query  # type: ignore[arg-type]
+
+
+async def _type_names(conn: AsyncConnection, oids: Sequence[int]) -> list[str]:
+    """Return the postgres name of each type oid, without typmods."""
+    dsn = conn.info.dsn
+    missing = sorted({oid for oid in oids if (dsn, oid) not in _type_name_cache})
+    if missing:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT t, format_type(t, NULL) FROM unnest(%s::oid[]) AS t",
+                (missing,),
+            )
+            for oid, name in await cur.fetchall():
+                _type_name_cache[(dsn, oid)] = _TYPMOD.sub("", name)
+    return [_type_name_cache[(dsn, oid)] for oid in oids]
+
+
+def _convert(
+    name: str, data_type: str, precision: int | None, scale: int | None
+) -> tuple[pl.DataType, pl.Expr, pl.Expr | None]:
+    """
+    Return the polars dtype of a postgres column and how to get it from CSV text.
+
+    Types without a mapping (json, uuid, arrays, enums, intervals...) are left as
+    the text postgres printed. Values polars' types can't hold (NaN and infinite
+    numerics, infinite dates and timestamps) become null. The third element is the
+    text the conversion reads once those are nulled, None when it can't fail, so
+    parse can check nothing else became null.
+    """
+    import polars as pl
+
+    col = pl.col(name)
+    casts: dict[str, pl.DataType] = {
+        "smallint": pl.Int16(),
+        "integer": pl.Int32(),
+        "bigint": pl.Int64(),
+        "oid": pl.UInt32(),
+        "real": pl.Float32(),
+        "double precision": pl.Float64(),
+    }
+    if data_type in casts:
+        # floats read NaN and Infinity as they are
+        dtype = casts[data_type]
+        return dtype, col.cast(dtype, strict=False), col
+    if data_type == "numeric":
+        if scale is None or precision is None or precision > DECIMAL_MAX_PRECISION:
+            return pl.Float64(), col.cast(pl.Float64, strict=False), col
+        source = pl.when(~col.is_in(NUMERIC_SPECIALS)).then(col)
+        dtype = pl.Decimal(precision, scale)
+        return dtype, source.cast(dtype, strict=False).alias(name), source
+    if data_type == "boolean":
+        return pl.Boolean(), col == "t", None
+    source = pl.when(~col.is_in(["infinity", "-infinity"])).then(col)
+    if data_type == "date":
+        return (
+            pl.Date(),
+            source.str.to_date("%Y-%m-%d", strict=False).alias(name),
+            source,
+        )
+    if data_type == "timestamp without time zone":
+        dtype = pl.Datetime("us")
+        return (
+            dtype,
+            source.str.to_datetime(
+                "%Y-%m-%d %H:%M:%S%.f", time_unit="us", strict=False
+            ).alias(name),
+            source,
+        )
+    if data_type == "timestamp with time zone":
+        # the session time zone decides the offsets printed, so normalize to UTC.
+        # Offsets are taken apart by hand since %z can't read the seconds that
+        # local mean time offsets of old timestamps have
+        parts = source.str.extract_groups(
+            r"^(?P<local>.+?)(?P<sign>[+-])(?P<h>\d\d)(?::(?P<m>\d\d))?(?::(?P<s>\d\d))?$"
+        )
+        offset = pl.duration(
+            hours=parts.struct.field("h").cast(pl.Int64),
+            minutes=parts.struct.field("m").cast(pl.Int64).fill_null(0),
+            seconds=parts.struct.field("s").cast(pl.Int64).fill_null(0),
+            time_unit="us",
+        )
+        local = (
+            parts.struct.field("local")
+            .str.to_datetime("%Y-%m-%d %H:%M:%S%.f", time_unit="us", strict=False)
+            .dt.replace_time_zone("UTC")
+        )
+        utc = pl.when(parts.struct.field("sign") == "-").then(local + offset)
+        return (
+            pl.Datetime("us", "UTC"),
+            utc.otherwise(local - offset).alias(name),
+            source,
+        )
+    if data_type == "bytea":
+        return pl.Binary(), col.str.strip_prefix("\\x").str.decode("hex"), None
+    return pl.String(), col, None
+
+
+def _last_row_end(buf: bytearray) -> int:
+    """
+    Return the end of the last complete CSV row in ``buf``, 0 if there isn't one.
+
+    A newline only ends a row when it's outside quotes, i.e. preceded by an even
+    number of quote characters (escaped quotes come in pairs).
+    """
+    end = buf.rfind(b"\n")
+    while end >= 0 and buf.count(b'"', 0, end) % 2:
+        end = buf.rfind(b"\n", 0, end)
+    return end + 1
+
+
+async def iter_from_db(
+    conn: AsyncConnection,
+    query: str | Composable,
+    params: Sequence | dict | None = None,
+    *,
+    batch_rows: int | None = 100_000,
+    buffer_size: int = READ_BUFFER_SIZE,
+) -> AsyncIterator[pl.DataFrame]:
+    """
+    Stream the result of a query into polars DataFrames with COPY TO STDOUT.
+
+    Rows come over the wire as CSV, which is buffered and parsed ``buffer_size``
+    bytes at a time by polars' CSV reader, so no python objects are created per
+    row. Columns are then cast from the query's postgres types: integers, floats,
+    numeric, boolean, date, timestamp(tz) and bytea map to their polars types,
+    everything else (json, uuid, arrays, enums, ...) stays String. timestamptz
+    becomes Datetime("us", "UTC"). numeric wider than 38 digits is read as
+    Float64. NaN and infinite values that Decimal, Date and Datetime can't hold
+    become null, any other value that can't be read raises ValueError.
+
+    Args:
+        conn (AsyncConnection): Async connection to the PostgreSQL database.
+        query (str | Composable): SELECT (or VALUES, TABLE...) query to read.
+        params (Sequence | dict | None, optional): Query parameters, bound client
+            side since COPY can't take server side ones. Defaults to None.
+        batch_rows (int | None, optional): Rows per yielded DataFrame, the last one
+            may be short. None yields each parsed buffer as it is. Defaults to 100_000.
+        buffer_size (int, optional): Bytes of CSV collected before parsing.
+            Defaults to 16 MiB.
+
+    Yields
+    ------
+        pl.DataFrame: Batches of the result. A query without rows yields one
+            empty DataFrame so the schema is always available.
+    """
+    import polars as pl
+    from psycopg.pq import TransactionStatus
+    from psycopg.sql import SQL
+
+    if batch_rows is not None and batch_rows < 1:
+        msg = "batch_rows must be at least 1"
+        raise ValueError(msg)
+    query = _as_sql(query)
+    own_transaction = conn.info.transaction_status == TransactionStatus.IDLE
+    async with conn.transaction(), conn.cursor() as cur:
+        # the parsing relies on these, which are postgres' defaults. They're only
+        # pinned in a transaction of our own so the caller's settings don't change
+        if own_transaction:
+            await cur.execute("SET LOCAL DateStyle = 'ISO'")
+            await cur.execute("SET LOCAL bytea_output = 'hex'")
+        await cur.execute(SQL("SELECT * FROM ({}) AS q LIMIT 0").format(query), params)
+        description = cur.description or []
+        names = [c.name for c in description]
+        data_types = await _type_names(conn, [c.type_code for c in description])
+        conversions = [
+            _convert(name, data_type, c.precision, c.scale)
+            for name, data_type, c in zip(names, data_types, description)
+        ]
+        text_schema = pl.Schema(dict.fromkeys(names, pl.String()))
+
+        def parse(data: bytes) -> pl.DataFrame:
+            frame = pl.read_csv(
+                data, has_header=False, schema=text_schema, quote_char='"'
+            )
+            converted = frame.select(expr for _, expr, _ in conversions)
+            # the casts don't raise, so values they couldn't read show up as
+            # more nulls than the text had
+            for name, (dtype, _, source) in zip(names, conversions):
+                if source is None:
+                    continue
+                expected = frame.select(source.null_count()).item()
+                if converted[name].null_count() != expected:
+                    bad = frame.filter(
+                        converted[name].is_null() & source.is_not_null()
+                    )[name]
+                    msg = (
+                        f"column {name} has values that aren't {dtype}, e.g. {bad[0]!r}"
+                    )
+                    raise ValueError(msg)
+            return converted
+
+        yielded = False
+        pending: pl.DataFrame | None = None
+
+        def batches(frame: pl.DataFrame, *, final: bool = False):
+            nonlocal pending
+            if batch_rows is None:
+                if frame.height > 0:
+                    yield frame
+                return
+            if pending is not None:
+                frame = pl.concat([pending, frame], rechunk=False)
+            while frame.height >= batch_rows or (final and frame.height > 0):
+                yield frame.slice(0, batch_rows)
+                frame = frame.slice(batch_rows)
+            pending = frame
+
+        buf = bytearray()
+        copy_qry = SQL("COPY ({}) TO STDOUT (FORMAT CSV)").format(query)
+        async with cur.copy(copy_qry, params) as copy:
+            async for data in copy:
+                buf += data
+                if len(buf) < buffer_size:
+                    continue
+                if (end := _last_row_end(buf)) == 0:
+                    continue
+                frame = parse(bytes(memoryview(buf)[:end]))
+                del buf[:end]
+                for batch in batches(frame):
+                    yielded = True
+                    yield batch
+        for batch in batches(parse(bytes(buf)), final=True):
+            yielded = True
+            yield batch
+        if not yielded:
+            yield pl.DataFrame(
+                schema={name: dtype for name, (dtype, _, _) in zip(names, conversions)}
+            )
+
+
+async def from_db(
+    conn: AsyncConnection,
+    query: str | Composable,
+    params: Sequence | dict | None = None,
+    *,
+    buffer_size: int = READ_BUFFER_SIZE,
+) -> pl.DataFrame:
+    """
+    Read the result of a query into one polars DataFrame with COPY TO STDOUT.
+
+    See iter_from_db for how the rows are transferred and typed.
+
+    Args:
+        conn (AsyncConnection): Async connection to the PostgreSQL database.
+        query (str | Composable): SELECT (or VALUES, TABLE...) query to read.
+        params (Sequence | dict | None, optional): Query parameters, bound client
+            side since COPY can't take server side ones. Defaults to None.
+        buffer_size (int, optional): Bytes of CSV collected before parsing.
+            Defaults to 16 MiB.
+
+    Returns
+    -------
+        pl.DataFrame: The whole result.
+    """
+    import polars as pl
+
+    frames = [
+        frame
+        async for frame in iter_from_db(
+            conn, query, params, batch_rows=None, buffer_size=buffer_size
+        )
+    ]
+    return pl.concat(frames, rechunk=False) if len(frames) > 1 else frames[0]
@@ -1,67 +1,451 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
-from typing import TYPE_CHECKING
+import inspect
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple, TypeAlias
 
 if TYPE_CHECKING:
     import polars as pl
-    from psycopg import AsyncConnection
-    from psycopg.sql import Composed
-from dean_utils.utils.info_sql import info_sql
+    from psycopg import AsyncConnection, AsyncCursor
+    from psycopg.sql import Composable, Composed
+    from psycopg_pool import AsyncConnectionPool
+from dean_utils.utils.info_sql import info_sql, schema_info_sql
+from dean_utils.utils.pg_binary import TEXT_TYPES, binary_compatible, iter_binary_copy
+from dean_utils.utils.pl_from_db import from_db
 
+CopyFormat: TypeAlias = Literal["text", "binary"]
+# "all" updates every conflicting row, "changed" only rows whose values differ,
+# "merge" is "changed" done with MERGE instead of INSERT ... ON CONFLICT
+UpdateMode: TypeAlias = Literal["all", "changed", "merge"]
+Dedupe: TypeAlias = Literal["first", "last", "error"]
+FrameSource: TypeAlias = "pl.DataFrame | pl.LazyFrame | Iterable[pl.DataFrame]"
 
-async def _get_table_def(conn: AsyncConnection, table_schema_name: str):
+
+def _source_schema(df: FrameSource) -> tuple[pl.Schema | None, FrameSource]:
+    """
+    Return the schema of a frame source without materializing it.
+
+    Iterators have to be advanced to see their first frame, so the source is
+    returned again with that frame chained back on. The schema is None when an
+    iterator is empty.
+    """
+    import polars as pl
+
+    if isinstance(df, pl.DataFrame):
+        return df.schema, df
+    if isinstance(df, pl.LazyFrame):
+        return df.collect_schema(), df
+    frames = iter(df)
+    first = next(frames, None)
+    if first is None:
+        return None, ()
+    return first.schema, chain([first], frames)
+
+
+def _iter_batches(
+    df: FrameSource, columns: Sequence[str | pl.Expr], batch_size: int
+) -> Iterator[pl.DataFrame]:
+    """Yield ``columns`` of a frame source in slices of at most ``batch_size`` rows."""
     import polars as pl
 
+    if isinstance(df, pl.LazyFrame):
+        lf = df.select(columns)
+        if hasattr(lf, "collect_batches"):
+            yield from lf.collect_batches(chunk_size=batch_size)
+            return
+        df = lf.collect(engine="streaming")
+    if isinstance(df, pl.DataFrame):
+        df = [df]
+    for frame in df:
+        yield from frame.select(columns).iter_slices(batch_size)
+
+
+TABLE_DEF_COLUMNS = ["column_name", "is_nullable", "data_type", "is_array", "user_type"]
+TABLE_DEF_TTL = 300.0
+
+# (dsn, "schema.table") -> (monotonic time fetched, table_def)
+_table_def_cache: dict[tuple[str, str], tuple[float, pl.DataFrame]] = {}
+
+
+def _split_table_name(table_schema_name: str) -> tuple[str, str]:
     if "." in table_schema_name:
         table_schema, table_name = table_schema_name.split(".", maxsplit=1)
     else:
         table_schema = "public"
         table_name = table_schema_name
+    return table_schema, table_name
+
+
+def invalidate_table_defs(
+    conn: AsyncConnection | None = None, target_table: str | None = None
+) -> None:
+    """
+    Drop cached table definitions so the next to_db re-reads the catalog.
+
+    Call this after altering a table that to_db writes to.
+
+    Args:
+        conn (AsyncConnection | None, optional): Only drop entries for this connection's
+            DSN. Defaults to None which means every connection.
+        target_table (str | None, optional): Only drop this table ('schema.table' or
+            'table'). Defaults to None which means every table.
+    """
+    dsn = None if conn is None else conn.info.dsn
+    table = None if target_table is None else ".".join(_split_table_name(target_table))
+    for key in list(_table_def_cache):
+        if (dsn is None or key[0] == dsn) and (table is None or key[1] == table):
+            del _table_def_cache[key]
+
+
+async def prefetch_table_defs(
+    conn: AsyncConnection, table_schema: str = "public"
+) -> list[str]:
+    """
+    Load the definitions of every table in a schema into the cache with one query.
+
+    Args:
+        conn (AsyncConnection): Async connection to the PostgreSQL database.
+        table_schema (str, optional): Schema to load. Defaults to "public".
+
+    Returns
+    -------
+        list[str]: The 'schema.table' names that were cached.
+    """
+    import polars as pl
+
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute(schema_info_sql, (table_schema,))
+        rows = await cur.fetchall()
+    all_defs = pl.DataFrame(
+        rows, schema=["table_name", *TABLE_DEF_COLUMNS], orient="row"
+    )
+    fetched = time.monotonic()
+    cached = []
+    for (table_name,), table_def in all_defs.partition_by(
+        "table_name", as_dict=True, include_key=False
+    ).items():
+        table = f"{table_schema}.{table_name}"
+        _table_def_cache[(conn.info.dsn, table)] = (fetched, table_def)
+        cached.append(table)
+    return cached
+
+
+async def _get_table_def(
+    conn: AsyncConnection,
+    table_schema_name: str,
+    ttl: float | None = TABLE_DEF_TTL,
+):
+    import polars as pl
+
+    table_schema, table_name = _split_table_name(table_schema_name)
+    key = (conn.info.dsn, f"{table_schema}.{table_name}")
+    if ttl is not None and (hit := _table_def_cache.get(key)) is not None:
+        fetched, table_def = hit
+        if time.monotonic() - fetched < ttl:
+            return table_def
 
     # table_def_sql = await deparameter_qry(
     #     conn, table_def_sql, (table_schema, table_name)
     # )
-    async with conn.cursor() as cur:
+    # in its own transaction so that without autocommit the catalog query doesn't
+    # leave one open, which would make the load's transaction a savepoint in it
+    async with conn.transaction(), conn.cursor() as cur:
         await cur.execute(info_sql, (table_schema, table_name))
         rows = await cur.fetchall()
-    table_def = pl.DataFrame(
-        rows,
-        schema=["column_name", "is_nullable", "data_type", "is_array", "user_type"],
-    )
+    table_def = pl.DataFrame(rows, schema=TABLE_DEF_COLUMNS, orient="row")
+    # a missing table isn't cached so creating it takes effect right away
+    if ttl is not None and table_def.height > 0:
+        _table_def_cache[key] = (time.monotonic(), table_def)
     return table_def
 
 
-async def _insert_via_temp_table(
+async def _get_table_defs(
     conn: AsyncConnection,
-    df: pl.DataFrame,
+    table_schema_names: Sequence[str],
+    ttl: float | None = TABLE_DEF_TTL,
+) -> dict[str, pl.DataFrame]:
+    """Like _get_table_def for several tables, with the misses fetched in one pipeline."""
+    import polars as pl
+
+    table_defs = {}
+    misses = {}
+    now = time.monotonic()
+    for name in table_schema_names:
+        key = (conn.info.dsn, ".".join(_split_table_name(name)))
+        hit = _table_def_cache.get(key) if ttl is not None else None
+        if hit is not None and now - hit[0] < ttl:
+            table_defs[name] = hit[1]
+        else:
+            misses[name] = key
+    if not misses:
+        return table_defs
+    cursors = {name: conn.cursor() for name in misses}
+    async with conn.transaction():
+        async with conn.pipeline():
+            for name, cur in cursors.items():
+                await cur.execute(info_sql, _split_table_name(name))
+        for name, cur in cursors.items():
+            rows = await cur.fetchall()
+            await cur.close()
+            table_def = pl.DataFrame(rows, schema=TABLE_DEF_COLUMNS, orient="row")
+            if ttl is not None and table_def.height > 0:
+                _table_def_cache[misses[name]] = (time.monotonic(), table_def)
+            table_defs[name] = table_def
+    return table_defs
+
+
+STAGING_PREFIX = "to_db_stage_"
+
+
+async def drop_staging_tables(conn: AsyncConnection) -> list[str]:
+    """
+    Drop the staging tables to_db created in this connection's session.
+
+    They are temporary tables, so closing the connection drops them anyway. This
+    is for long lived (pooled) connections that should give them up sooner.
+
+    Args:
+        conn (AsyncConnection): Async connection whose session owns the tables.
+
+    Returns
+    -------
+        list[str]: Names of the dropped tables.
+    """
+    from psycopg.sql import SQL, Identifier
+
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "SELECT relname FROM pg_class "
+            "WHERE relnamespace = pg_my_temp_schema() AND relname LIKE %s",
+            (STAGING_PREFIX.replace("_", r"\_") + "%",),
+        )
+        names = [row[0] for row in await cur.fetchall()]
+        for name in names:
+            await cur.execute(
+                SQL("DROP TABLE IF EXISTS pg_temp.{}").format(Identifier(name))
+            )
+    return names
+
+
+class _LoadPlan(NamedTuple):
+    """Everything about a load that only depends on the schemas, not the data."""
+
+    columns: list[str]
+    # columns converted to what the COPY is fed, in the order of columns
+    copy_exprs: list[pl.Expr]
+    temp_types: list[str]
+    staging_table: str
+    create_table_sql: Composed
+    truncate_sql: Composed
+    copy_qry: Composed
+    ins_qry: Composed
+    # COPY straight into the target, only valid without upsert
+    direct_copy_qry: Composed
+    # whether every column reaches the target without a cast
+    no_casts: bool
+    # each staged column as "source.col" with its cast to the target type
+    source_values: list[Composed]
+    # run before ins_qry and returns (inserted, updated), only for "merge"
+    count_qry: Composed | None
+    # ins_qry itself returns (inserted, updated), only for "changed"
+    ins_returns_counts: bool
+
+
+@dataclass
+class LoadStats:
+    """
+    What a to_db call did and where the time went.
+
+    ``timings`` holds wall seconds per phase: "table_def", "dedupe", "plan",
+    "copy" (which includes collecting lazy sources) and "insert", plus "hash"
+    and "delete" for delta loads. ``bytes`` is the size of the COPY data sent,
+    None when no COPY ran. ``inserted``, ``updated`` and ``unchanged`` are only
+    known for direct COPYs, change-only upserts and delta loads, otherwise they
+    are None. ``deleted`` is only set by delta loads that delete missing rows.
+    """
+
+    target_table: str = ""
+    rows: int = 0
+    bytes: int | None = None
+    rows_affected: int = 0
+    duplicates_dropped: int = 0
+    inserted: int | None = None
+    updated: int | None = None
+    unchanged: int | None = None
+    deleted: int | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    # commit_every loads only: chunks committed by this call and chunks skipped
+    # because an earlier attempt with the same load_id already committed them
+    chunks: int = 0
+    chunks_resumed: int = 0
+
+
+def _add_insert_counts(
+    stats: LoadStats,
+    update_mode: UpdateMode,
+    staged: int,
+    rowcount: int,
+    counts: tuple[int, int] | None,
+) -> None:
+    """Add the outcome of one INSERT/MERGE of ``staged`` rows to ``stats``."""
+    if update_mode == "all":
+        stats.rows_affected += rowcount
+        return
+    inserted, updated = counts
+    stats.inserted = (stats.inserted or 0) + inserted
+    stats.updated = (stats.updated or 0) + updated
+    stats.unchanged = (stats.unchanged or 0) + staged - inserted - updated
+    stats.rows_affected += inserted + updated
+
+
+@contextmanager
+def _phase(stats: LoadStats, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] = stats.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class DuplicateKeysError(Exception):
+    pass
+
+
+def _dedupe(
+    df: FrameSource, upsert: Sequence[str], dedupe: Dedupe
+) -> tuple[FrameSource, int]:
+    """
+    Resolve rows sharing upsert keys in one polars pass.
+
+    Returns the deduplicated source and how many rows were dropped. LazyFrames
+    stay lazy, only their key columns are collected to count duplicates.
+    """
+    import polars as pl
+
+    if isinstance(df, pl.DataFrame):
+        keys = df.select(upsert)
+    elif isinstance(df, pl.LazyFrame):
+        keys = df.select(upsert).collect()
+    else:
+        msg = "dedupe needs all rows at once, pass a DataFrame or LazyFrame"
+        raise TypeError(msg)
+    dropped = keys.height - keys.n_unique()
+    if dropped == 0:
+        return df, 0
+    if dedupe == "error":
+        dupes = keys.filter(keys.is_duplicated()).unique().head(5)
+        msg = f"{dropped} rows repeat upsert keys {list(upsert)}, e.g. {dupes.rows()}"
+        raise DuplicateKeysError(msg)
+    # keep the row order so chunks resumed by load_id cover the same rows
+    return df.unique(subset=upsert, keep=dedupe, maintain_order=True), dropped
+
+
+def _copy_value(
+    col_name: str, pltype: pl.DataType, data_type: str, copy_format: CopyFormat
+) -> pl.Expr:
+    """
+    Return ``col_name`` as it should be fed to COPY for a ``data_type`` column.
+
+    Values psycopg would otherwise adapt one at a time (or not at all) are
+    turned into their postgres text form with column operations up front:
+    Decimal to numeric text, Struct to json, Binary to hex bytea (text COPY
+    only, binary COPY sends the bytes as they are) and List/Array to array
+    literals. Anything else is passed through.
+    """
+    import polars as pl
+
+    col = pl.col(col_name)
+    if isinstance(pltype, pl.Array):
+        col = col.arr.to_list()
+        pltype = pl.List(pltype.inner)
+    if isinstance(pltype, pl.Decimal):
+        return col.cast(pl.String)
+    if isinstance(pltype, pl.Struct) and data_type in ("json", "jsonb"):
+        # json_encode turns a null struct into the string 'null'
+        return pl.when(col.is_not_null()).then(col.struct.json_encode()).alias(col_name)
+    if pltype == pl.Binary and data_type == "bytea" and copy_format == "text":
+        return (pl.lit("\\x") + col.bin.encode("hex")).alias(col_name)
+    if (
+        isinstance(pltype, pl.List)
+        and data_type.endswith("[]")
+        and not pltype.inner.is_nested()
+    ):
+        # every element quoted, so no element type needs its own rules
+        elem = pl.element().cast(pl.String)
+        quoted = (
+            pl.lit('"')
+            + elem.str.replace_all("\\", "\\\\", literal=True).str.replace_all(
+                '"', '\\"', literal=True
+            )
+            + pl.lit('"')
+        )
+        items = pl.when(elem.is_null()).then(pl.lit("NULL")).otherwise(quoted)
+        return (pl.lit("{") + col.list.eval(items).list.join(",") + pl.lit("}")).alias(
+            col_name
+        )
+    return col
+
+
+LOAD_PLAN_CACHE_SIZE = 256
+# types without an equality operator (or, for box and circle, one that only
+# compares areas) and what to cast them to when looking for changed rows
+EQUALITY_CASTS = {
+    "json": "jsonb",
+    "xml": "text",
+    "point": "text",
+    "line": "text",
+    "lseg": "text",
+    "box": "text",
+    "path": "text",
+    "polygon": "text",
+    "circle": "text",
+}
+
+# (target_table, df schema, upsert, copy_format, table_def rows) -> _LoadPlan
+_load_plan_cache: dict[tuple, _LoadPlan] = {}
+
+
+def _build_load_plan(
+    schema: pl.Schema,
     table_def: pl.DataFrame,
     target_table: str,
-    upsert: Sequence[str] | None = None,
-):
+    upsert: Sequence[str],
+    copy_format: CopyFormat,
+    update_mode: UpdateMode = "all",
+) -> _LoadPlan:
     import polars as pl
     from polars import col as c
     from polars import lit
     from psycopg.sql import SQL, Identifier
 
-    if upsert is None:
-        upsert = ()
-    if "." in target_table:
-        table_schema, table_name = target_table.split(".", maxsplit=1)
-    else:
-        table_schema = "public"
-        table_name = target_table
-    same_cols = [x for x in df.columns if x in table_def["column_name"]]
+    table_schema, table_name = _split_table_name(target_table)
+    same_cols = [x for x in schema.names() if x in table_def["column_name"]]
     table_def = table_def.filter(c.column_name.is_in(same_cols))
     df_schema = pl.DataFrame(
-        [{"column_name": x, "pltype": str(y)} for x, y in df.schema.items()]
+        [{"column_name": x, "pltype": str(y)} for x, y in schema.items()]
     )
     # print(df_schema)
-    df = df.select(same_cols)
     create_table_lines = []
     copy_qry_elements = []
     select_qry_elements = []
     combined_schema = df_schema.join(table_def, on="column_name")
+    # info_sql reports the element type of array columns
+    combined_schema = combined_schema.with_columns(
+        data_type=pl.when(c.is_array)
+        .then(c.data_type + lit("[]"))
+        .otherwise(c.data_type)
+    )
+    copy_exprs = [
+        _copy_value(col_name, schema[col_name], data_type, copy_format)
+        for col_name, data_type in combined_schema.select(
+            "column_name", "data_type"
+        ).iter_rows()
+    ]
     combined_schema = combined_schema.with_columns(
         temp_type=pl.when(
             (c.pltype == "String") & (c.data_type.is_in(["character varying", "text"]))
@@ -91,9 +475,30 @@ async def _insert_via_temp_table(
         .then(lit("NOT NULL"))
         .otherwise(lit("")),
     ).unnest("temp_type")
+    if copy_format == "binary":
+        # binary COPY needs the wire type of every temp column to match its
+        # polars dtype exactly, anything else is sent as text and cast on insert
+        copy_schema = pl.LazyFrame(schema=schema).select(copy_exprs).collect_schema()
+        combined_schema = combined_schema.with_columns(
+            binary_ok=pl.Series(
+                [
+                    binary_compatible(copy_schema[col_name], temp_type)
+                    for col_name, temp_type in combined_schema.select(
+                        "column_name", "temp_type"
+                    ).iter_rows()
+                ],
+                dtype=pl.Boolean,
+            )
+        ).with_columns(
+            temp_type=pl.when(c.binary_ok).then(c.temp_type).otherwise(lit("text")),
+            sel_entry=pl.when(c.binary_ok | c.data_type.is_in(TEXT_TYPES))
+            .then(c.sel_entry)
+            .otherwise(pl.coalesce(c.sel_entry, c.user_type, c.data_type)),
+        )
     # print(combined_schema)
-    df = df.select(combined_schema["column_name"].to_list())
     update_excluded: list[Composed] = []
+    # staged value of each column as the target sees it, for MERGE
+    source_values: dict[str, Composed] = {}
     # assert_series_equal(combined_schema["column_name"], pl.Series("column_name", df.columns))
     for col_name, temp_type, nullability, sel_entry in combined_schema.select(
         "column_name", "temp_type", "nullability", "sel_entry"
@@ -108,73 +513,1088 @@ async def _insert_via_temp_table(
             SQL(" ").join([Identifier(col_name), SQL(temp_type), SQL(nullability)])
         )
         copy_qry_elements.append(Identifier(col_name))
+        source_values[col_name] = SQL("source.{}").format(Identifier(col_name))
         if sel_entry is None:
             select_qry_elements.append(Identifier(col_name))
         else:
             select_qry_elements.append(
                 SQL("::").join([Identifier(col_name), SQL(sel_entry)])
             )
+            source_values[col_name] = SQL("::").join(
+                [source_values[col_name], SQL(sel_entry)]
+            )
+    # one staging table per distinct temp layout, reused for the whole session
+    staging_table = (
+        STAGING_PREFIX
+        + blake2b(
+            repr(
+                combined_schema.select("column_name", "temp_type", "nullability").rows()
+            ).encode(),
+            digest_size=8,
+        ).hexdigest()
+    )
+    staging = Identifier(staging_table)
     col_list = SQL("").join([SQL("("), SQL(", ").join(copy_qry_elements), SQL(")")])
-    copy_qry = SQL("").join([SQL("COPY abcd "), col_list, SQL(" FROM STDIN")])
+    copy_qry = SQL("").join(
+        [SQL("COPY {} ").format(staging), col_list, SQL(" FROM STDIN")]
+    )
+    direct_copy_qry = SQL("").join(
+        [
+            SQL("COPY {}.{} ").format(Identifier(table_schema), Identifier(table_name)),
+            col_list,
+            SQL(" FROM STDIN"),
+        ]
+    )
+    if copy_format == "binary":
+        copy_qry = SQL("").join([copy_qry, SQL(" (FORMAT BINARY)")])
+        direct_copy_qry = SQL("").join([direct_copy_qry, SQL(" (FORMAT BINARY)")])
     # print(copy_qry.as_string())
     create_table_sql = SQL("\n").join(
         [
-            SQL("CREATE TEMPORARY TABLE abcd ("),
+            SQL("CREATE TEMPORARY TABLE IF NOT EXISTS {} (").format(staging),
             SQL(",\n").join(create_table_lines),
-            SQL(")"),
+            SQL(") ON COMMIT DELETE ROWS"),
         ]
     )
     # print(create_table_sql.as_string())
-    async with conn.transaction():
-        await conn.execute(create_table_sql)
-        async with conn.cursor() as cur, cur.copy(copy_qry) as cp:
-            for row in df.iter_rows():
-                await cp.write_row(row)
+    target = SQL("{}.{}").format(Identifier(table_schema), Identifier(table_name))
+    update_cols = [x for x in source_values if x not in upsert]
+    data_types = dict(combined_schema.select("column_name", "data_type").iter_rows())
+
+    def comparable(col_name: str, value: Composable) -> Composable:
+        data_type = data_types[col_name]
+        element_type = data_type.removesuffix("[]")
+        if element_type not in EQUALITY_CASTS:
+            return value
+        cast = EQUALITY_CASTS[element_type] + data_type[len(element_type) :]
+        return SQL("({})::{}").format(value, SQL(cast))
 
+    # the row as it is in the table vs as it was staged, for change-only updates
+    changed = SQL("({}) IS DISTINCT FROM ({})").format(
+        SQL(", ").join(
+            [comparable(x, SQL("target.{}").format(Identifier(x))) for x in update_cols]
+        ),
+        SQL(", ").join(
+            [
+                comparable(
+                    x,
+                    SQL("EXCLUDED.{}").format(Identifier(x))
+                    if update_mode == "changed"
+                    else source_values[x],
+                )
+                for x in update_cols
+            ]
+        ),
+    )
+    count_qry = None
+    if update_mode == "merge":
+        on = SQL(" AND ").join(
+            [
+                SQL("target.{} = {}").format(Identifier(x), source_values[x])
+                for x in upsert
+            ]
+        )
         ins_qry = [
-            SQL("INSERT INTO {}.{}").format(
-                Identifier(table_schema), Identifier(table_name)
-            ),
+            SQL("MERGE INTO {} AS target").format(target),
+            SQL("USING {} AS source ON {}").format(staging, on),
+        ]
+        if len(update_cols) > 0:
+            ins_qry.extend(
+                [
+                    SQL("WHEN MATCHED AND {} THEN UPDATE SET").format(changed),
+                    SQL(",\n").join(
+                        [
+                            SQL("{}={}").format(Identifier(x), source_values[x])
+                            for x in update_cols
+                        ]
+                    ),
+                ]
+            )
+        ins_qry.append(
+            SQL("WHEN NOT MATCHED THEN INSERT {} VALUES ({})").format(
+                col_list, SQL(", ").join(list(source_values.values()))
+            )
+        )
+        # MERGE can't report what it did per row before PG17, so count the same
+        # join right before it in the same transaction
+        count_qry = SQL("\n").join(
+            [
+                SQL("SELECT count(*) FILTER (WHERE target.ctid IS NULL),"),
+                SQL("count(*) FILTER (WHERE target.ctid IS NOT NULL AND {})").format(
+                    changed if len(update_cols) > 0 else SQL("false")
+                ),
+                SQL("FROM {} AS source LEFT JOIN {} AS target ON {}").format(
+                    staging, target, on
+                ),
+            ]
+        )
+    else:
+        ins_qry = [
+            SQL("INSERT INTO {}").format(target),
             col_list,
             SQL("SELECT "),
             SQL(", ").join(select_qry_elements),
-            SQL("FROM abcd"),
+            SQL("FROM {}").format(staging),
         ]
+        if update_mode == "changed":
+            ins_qry[0] = SQL("INSERT INTO {} AS target").format(target)
 
-        if len(upsert) > 0:
-            upsert_sql = SQL(",").join([Identifier(x) for x in upsert])
+    if len(upsert) > 0 and update_mode != "merge":
+        upsert_sql = SQL(",").join([Identifier(x) for x in upsert])
+        ins_qry.append(SQL("").join([SQL("ON CONFLICT ("), upsert_sql, SQL(")")]))
+        if len(update_excluded) == 0:
+            ins_qry.append(SQL("DO NOTHING"))
+        else:
             update_excluded_sql = SQL(",\n").join(update_excluded)
-            ins_qry.extend(
-                [
-                    SQL("").join([SQL("ON CONFLICT ("), upsert_sql, SQL(")")]),
-                    SQL("DO UPDATE"),
-                    SQL("SET"),
-                ]
-            )
+            ins_qry.extend([SQL("DO UPDATE"), SQL("SET")])
             ins_qry.append(update_excluded_sql)
-        ins_qry = SQL("\n").join(ins_qry)
-        try:
-            await conn.execute(ins_qry)
-        except Exception:
-            print(ins_qry.strings)
-            raise
+            if update_mode == "changed":
+                ins_qry.append(SQL("WHERE {}").format(changed))
+    if update_mode == "changed":
+        # xmax is 0 only for freshly inserted rows, rows the WHERE skipped
+        # aren't returned at all
+        ins_qry = [
+            SQL("WITH upserted AS ("),
+            *ins_qry,
+            SQL("RETURNING (xmax = 0) AS inserted)"),
+            SQL(
+                "SELECT count(*) FILTER (WHERE inserted), "
+                "count(*) FILTER (WHERE NOT inserted) FROM upserted"
+            ),
+        ]
+    return _LoadPlan(
+        columns=combined_schema["column_name"].to_list(),
+        copy_exprs=copy_exprs,
+        temp_types=combined_schema["temp_type"].to_list(),
+        staging_table=staging_table,
+        create_table_sql=create_table_sql,
+        truncate_sql=SQL("TRUNCATE {}").format(staging),
+        copy_qry=copy_qry,
+        ins_qry=SQL("\n").join(ins_qry),
+        direct_copy_qry=direct_copy_qry,
+        no_casts=combined_schema["sel_entry"].is_null().all(),
+        source_values=list(source_values.values()),
+        count_qry=count_qry,
+        ins_returns_counts=update_mode == "changed",
+    )
+
+
+def _get_load_plan(
+    schema: pl.Schema,
+    table_def: pl.DataFrame,
+    target_table: str,
+    upsert: Sequence[str],
+    copy_format: CopyFormat,
+    update_mode: UpdateMode = "all",
+) -> _LoadPlan:
+    """
+    Return the load plan for these schemas, building it only on a cache miss.
+
+    The table definition itself is part of the key so a plan is rebuilt
+    whenever a refreshed definition shows the table changed.
+    """
+    key = (
+        target_table,
+        tuple(schema.items()),
+        tuple(upsert),
+        copy_format,
+        update_mode,
+        tuple(table_def.iter_rows()),
+    )
+    plan = _load_plan_cache.get(key)
+    if plan is None:
+        plan = _build_load_plan(
+            schema, table_def, target_table, upsert, copy_format, update_mode
+        )
+        if len(_load_plan_cache) >= LOAD_PLAN_CACHE_SIZE:
+            del _load_plan_cache[next(iter(_load_plan_cache))]
+        _load_plan_cache[key] = plan
+    return plan
+
+
+async def _copy_frames(
+    cur: AsyncCursor,
+    copy_qry: Composed,
+    frames: Iterable[pl.DataFrame],
+    temp_types: Sequence[str],
+    copy_format: CopyFormat,
+    stats: LoadStats,
+) -> None:
+    """Run ``copy_qry`` feeding it ``frames`` in the format it was built for."""
+
+    def counted(frames: Iterable[pl.DataFrame]) -> Iterator[pl.DataFrame]:
+        for frame in frames:
+            stats.rows += frame.height
+            yield frame
+
+    if stats.bytes is None:
+        stats.bytes = 0
+    async with cur.copy(copy_qry) as cp:
+        if copy_format == "binary":
+            for block in iter_binary_copy(counted(frames), temp_types):
+                stats.bytes += len(block)
+                await cp.write(block)
+        else:
+            # encode the rows the way write_row would, but write the buffers
+            # ourselves so their size can be counted
+            formatter = cp.formatter
+            for frame in counted(frames):
+                for row in frame.iter_rows():
+                    if data := formatter.write_row(row):
+                        stats.bytes += len(data)
+                        await cp.write(data)
+            if data := formatter.end():
+                stats.bytes += len(data)
+                await cp.write(data)
+
+
+async def _insert_via_temp_table(
+    conn: AsyncConnection,
+    df: FrameSource,
+    table_def: pl.DataFrame,
+    target_table: str,
+    upsert: Sequence[str] | None = None,
+    *,
+    copy_format: CopyFormat = "text",
+    batch_size: int = 100_000,
+    direct: bool | None = None,
+    update_mode: UpdateMode = "all",
+    dedupe: Dedupe | None = None,
+    stats: LoadStats | None = None,
+) -> LoadStats:
+    from psycopg.pq import TransactionStatus
+
+    if upsert is None:
+        upsert = ()
+    if update_mode != "all" and len(upsert) == 0:
+        msg = "only changed rows can be updated when there are upsert keys"
+        raise ValueError(msg)
+    if update_mode == "merge" and conn.info.server_version < 150000:
+        msg = "MERGE needs PostgreSQL 15 or later"
+        raise ValueError(msg)
+    if stats is None:
+        stats = LoadStats(target_table)
+    if dedupe is not None:
+        if len(upsert) == 0:
+            msg = "dedupe needs upsert keys"
+            raise ValueError(msg)
+        with _phase(stats, "dedupe"):
+            df, dropped = _dedupe(df, upsert, dedupe)
+        stats.duplicates_dropped += dropped
+    schema, df = _source_schema(df)
+    if schema is None:
+        return stats
+    with _phase(stats, "plan"):
+        plan = _get_load_plan(
+            schema, table_def, target_table, upsert, copy_format, update_mode
+        )
+    frames = _iter_batches(df, plan.copy_exprs, batch_size)
+    if direct is None:
+        direct = len(upsert) == 0 and plan.no_casts
+    elif direct and len(upsert) > 0:
+        msg = "direct COPY can't upsert, use direct=False or drop upsert"
+        raise ValueError(msg)
+    elif direct and copy_format == "binary" and not plan.no_casts:
+        msg = "direct binary COPY needs every column to match its target type, use format='text'"
+        raise ValueError(msg)
+    # stats may already hold earlier chunks of the same load
+    rows_before = stats.rows
+    if direct:
+        # text COPY parses straight into the target types, so only the rows are
+        # written once and there's no INSERT ... SELECT
+        with _phase(stats, "copy"):
+            async with conn.transaction(), conn.cursor() as cur:
+                await _copy_frames(
+                    cur,
+                    plan.direct_copy_qry,
+                    frames,
+                    plan.temp_types,
+                    copy_format,
+                    stats,
+                )
+        copied = stats.rows - rows_before
+        stats.inserted = (stats.inserted or 0) + copied
+        stats.rows_affected += copied
+        return stats
+    # the staging table only empties itself on a real commit, so inside a
+    # caller's transaction it may still hold the rows of an earlier load
+    in_outer_transaction = conn.info.transaction_status != TransactionStatus.IDLE
+    async with conn.transaction():
+        await conn.execute(plan.create_table_sql)
+        if in_outer_transaction:
+            await conn.execute(plan.truncate_sql)
+        async with conn.cursor() as cur:
+            with _phase(stats, "copy"):
+                await _copy_frames(
+                    cur, plan.copy_qry, frames, plan.temp_types, copy_format, stats
+                )
+            with _phase(stats, "insert"):
+                counts = None
+                if plan.count_qry is not None:
+                    await cur.execute(plan.count_qry)
+                    counts = await cur.fetchone()
+
+                try:
+                    await cur.execute(plan.ins_qry)
+                except Exception as err:
+                    # add_note is 3.11+, on 3.10 the error goes out as it is
+                    if hasattr(err, "add_note"):
+                        err.add_note(plan.ins_qry.as_string(conn))
+                    raise
+                if plan.ins_returns_counts:
+                    counts = await cur.fetchone()
+                _add_insert_counts(
+                    stats, update_mode, stats.rows - rows_before, cur.rowcount, counts
+                )
+    return stats
+
+
+CHECKPOINT_TABLE = "to_db_checkpoints"
+
+
+def _rechunk(frames: Iterable[pl.DataFrame], rows: int) -> Iterator[pl.DataFrame]:
+    """Regroup frames into chunks of exactly ``rows`` rows, the last one may be short."""
+    import polars as pl
+
+    pending: list[pl.DataFrame] = []
+    pending_rows = 0
+    for frame in frames:
+        while frame.height > 0:
+            take = min(rows - pending_rows, frame.height)
+            pending.append(frame.slice(0, take))
+            pending_rows += take
+            frame = frame.slice(take)
+            if pending_rows == rows:
+                yield pl.concat(pending, rechunk=False)
+                pending = []
+                pending_rows = 0
+    if pending_rows > 0:
+        yield pl.concat(pending, rechunk=False)
+
+
+async def _insert_in_chunks(
+    conn: AsyncConnection,
+    df: FrameSource,
+    table_def: pl.DataFrame,
+    target_table: str,
+    upsert: Sequence[str] | None,
+    *,
+    commit_every: int,
+    load_id: str | None,
+    checkpoint_table: str,
+    dedupe: Dedupe | None,
+    insert_kwargs: dict[str, Any],
+) -> None:
+    from psycopg.sql import SQL, Identifier
+
+    stats: LoadStats = insert_kwargs["stats"]
+    if dedupe is not None:
+        # duplicates can be in different chunks so resolve them over everything
+        if not upsert:
+            msg = "dedupe needs upsert keys"
+            raise ValueError(msg)
+        with _phase(stats, "dedupe"):
+            df, stats.duplicates_dropped = _dedupe(df, upsert, dedupe)
+    schema, df = _source_schema(df)
+    if schema is None:
+        return
+    checkpoint = Identifier(*_split_table_name(checkpoint_table))
+    done = rows_done = 0
+    if load_id is not None:
+        async with conn.transaction():
+            await conn.execute(
+                SQL(
+                    "CREATE TABLE IF NOT EXISTS {} ("
+                    "load_id text PRIMARY KEY, target_table text NOT NULL, "
+                    "chunks integer NOT NULL, rows bigint NOT NULL, "
+                    "updated_at timestamptz NOT NULL DEFAULT now())"
+                ).format(checkpoint)
+            )
+            cur = await conn.execute(
+                SQL("SELECT chunks, rows FROM {} WHERE load_id = %s").format(
+                    checkpoint
+                ),
+                (load_id,),
+            )
+            row = await cur.fetchone()
+        if row is not None:
+            done, rows_done = row
+    save_checkpoint = SQL(
+        "INSERT INTO {} (load_id, target_table, chunks, rows) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (load_id) DO UPDATE SET chunks = EXCLUDED.chunks, "
+        "rows = EXCLUDED.rows, updated_at = now()"
+    ).format(checkpoint)
+
+    for i, chunk in enumerate(
+        _rechunk(_iter_batches(df, schema.names(), commit_every), commit_every)
+    ):
+        if i < done:
+            stats.chunks_resumed += 1
+            continue
+        async with conn.transaction():
+            await _insert_via_temp_table(
+                conn, chunk, table_def, target_table, upsert, **insert_kwargs
+            )
+            rows_done += chunk.height
+            if load_id is not None:
+                await conn.execute(
+                    save_checkpoint, (load_id, target_table, i + 1, rows_done)
+                )
+        stats.chunks += 1
+    if load_id is not None:
+        async with conn.transaction():
+            await conn.execute(
+                SQL("DELETE FROM {} WHERE load_id = %s").format(checkpoint),
+                (load_id,),
+            )
 
 
 async def to_db(
     conn: AsyncConnection,
-    df: pl.DataFrame,
+    df: FrameSource,
     target_table: str,
     upsert: tuple[str] | None = None,
-) -> None:
+    *,
+    format: CopyFormat = "text",
+    batch_size: int = 100_000,
+    table_def_ttl: float | None = TABLE_DEF_TTL,
+    direct: bool | None = None,
+    update_only_changed: bool = False,
+    use_merge: bool = False,
+    dedupe: Dedupe | None = None,
+    on_stats: Callable[[LoadStats], Any] | None = None,
+    commit_every: int | None = None,
+    load_id: str | None = None,
+    checkpoint_table: str = CHECKPOINT_TABLE,
+) -> LoadStats:
     """
     Sends a polars DataFrame to a PostgreSQL table.
 
+    The load runs in its own transaction and is committed when to_db returns, also
+    on connections without autocommit, unless the connection was already in a
+    transaction, in which case committing is left to the caller.
+
     Args:
         conn (AsyncConnection): Async connection to the PostgreSQL database.
+        df (pl.DataFrame | pl.LazyFrame | Iterable[pl.DataFrame]): Data to insert into
+            the database. LazyFrames and iterators are streamed into the COPY
+            ``batch_size`` rows at a time so they never have to be held in memory
+            at once.
+        target_table (str): Target table name (format: 'schema.table' or 'table').
+        upsert (tuple[str] | None, optional): Column names to use as conflict keys for upsert
+            operations. Defaults to None.
+        format (Literal["text", "binary"], optional): COPY format. "text" writes the
+            rows one at a time through psycopg, "binary" encodes whole columns into
+            binary COPY blocks without creating python objects per row. Naive
+            Datetime columns only go natively to timestamp columns and tz aware
+            ones to timestamptz, other combinations are sent as text. Defaults to "text".
+        batch_size (int, optional): Rows collected from the source and written to
+            the COPY at a time. Defaults to 100_000.
+        table_def_ttl (float | None, optional): Seconds a cached definition of
+            target_table is trusted before the catalog is queried again. None skips
+            the cache. See prefetch_table_defs and invalidate_table_defs.
+            Defaults to 300.
+        direct (bool | None, optional): COPY straight into target_table instead of
+            staging the rows and running INSERT ... SELECT. None does that whenever
+            there's no upsert and no column needs a cast. True forces it (text
+            COPY lets postgres parse the values into the target types), False
+            always stages. Defaults to None.
+        update_only_changed (bool, optional): Only update conflicting rows whose
+            non key columns are distinct from what's in the table, so resending
+            unchanged rows doesn't rewrite them. Needs upsert. Defaults to False.
+        use_merge (bool, optional): Do the update_only_changed upsert with MERGE
+            (PostgreSQL 15+), which doesn't need a unique constraint on the upsert
+            columns. Defaults to False.
+        dedupe (Literal["first", "last", "error"] | None, optional): What to do with
+            rows that repeat upsert keys, which ON CONFLICT DO UPDATE can't handle.
+            "first"/"last" keep one of them, "error" raises DuplicateKeysError. Not
+            available for iterators of frames. Defaults to None.
+        on_stats (Callable[[LoadStats], Any] | None, optional): Called (and awaited
+            if it returns an awaitable) with the LoadStats of every successful load,
+            e.g. to export them as metrics. Defaults to None.
+        commit_every (int | None, optional): Stage, merge and commit the rows in
+            chunks of this many, each in its own transaction, instead of one
+            transaction for everything. conn must not be in a transaction.
+            Defaults to None.
+        load_id (str | None, optional): With commit_every, a name for this load.
+            Every chunk records the number of committed chunks under it in
+            checkpoint_table in the same transaction, and a retried call with the
+            same load_id skips those chunks. The source must produce the same rows
+            in the same order for that to be valid. The checkpoint is removed once
+            the load completes. Defaults to None.
+        checkpoint_table (str, optional): Table holding load_id checkpoints,
+            created if needed. Defaults to "to_db_checkpoints".
+
+    Returns
+    -------
+        LoadStats: Wall time per phase, rows and bytes copied, rows affected,
+            duplicates dropped and, when known, rows inserted, updated and left
+            unchanged.
+    """
+    if use_merge and not update_only_changed:
+        msg = "use_merge only applies with update_only_changed=True"
+        raise ValueError(msg)
+    if load_id is not None and commit_every is None:
+        msg = "load_id only applies with commit_every"
+        raise ValueError(msg)
+    if commit_every is not None and commit_every < 1:
+        msg = "commit_every must be at least 1"
+        raise ValueError(msg)
+    if commit_every is not None:
+        from psycopg.pq import TransactionStatus
+
+        if conn.info.transaction_status != TransactionStatus.IDLE:
+            msg = "commit_every needs a connection that isn't already in a transaction"
+            raise ValueError(msg)
+    stats = LoadStats(target_table)
+    with _phase(stats, "table_def"):
+        table_def = await _get_table_def(conn, target_table, table_def_ttl)
+    insert_kwargs: dict[str, Any] = {
+        "copy_format": format,
+        "batch_size": batch_size,
+        "direct": direct,
+        "update_mode": "merge"
+        if use_merge
+        else "changed"
+        if update_only_changed
+        else "all",
+        "stats": stats,
+    }
+    if commit_every is None:
+        await _insert_via_temp_table(
+            conn, df, table_def, target_table, upsert, dedupe=dedupe, **insert_kwargs
+        )
+    else:
+        await _insert_in_chunks(
+            conn,
+            df,
+            table_def,
+            target_table,
+            upsert,
+            commit_every=commit_every,
+            load_id=load_id,
+            checkpoint_table=checkpoint_table,
+            dedupe=dedupe,
+            insert_kwargs=insert_kwargs,
+        )
+    if on_stats is not None:
+        hooked = on_stats(stats)
+        if inspect.isawaitable(hooked):
+            await hooked
+    return stats
+
+
+class ParallelLoadError(Exception):
+    """
+    Raised by to_db_parallel when at least one slice failed.
+
+    ``row_counts`` holds the rows each worker loaded (0 for failed or rolled
+    back workers) and ``errors`` maps worker index to its exception.
+    """
+
+    def __init__(self, msg: str, row_counts: list[int], errors: dict[int, Exception]):
+        super().__init__(msg)
+        self.row_counts = row_counts
+        self.errors = errors
+
+
+def _partition_frame(
+    df: pl.DataFrame,
+    workers: int,
+    partition: Literal["rows", "hash"],
+    upsert: Sequence[str],
+) -> list[pl.DataFrame]:
+    import polars as pl
+
+    if partition == "hash":
+        if len(upsert) == 0:
+            msg = "hash partitioning needs upsert keys"
+            raise ValueError(msg)
+        # every copy of a key lands in the same slice so no two workers upsert
+        # the same row and contend on its lock
+        part = "__to_db_part"
+        return [
+            frame.drop(part)
+            for frame in df.with_columns(
+                (pl.struct(upsert).hash() % workers).alias(part)
+            ).partition_by(part)
+        ]
+    slice_rows = max(1, -(-df.height // workers))
+    return list(df.iter_slices(slice_rows))
+
+
+async def to_db_parallel(
+    pool: AsyncConnectionPool,
+    df: pl.DataFrame,
+    target_table: str,
+    upsert: tuple[str] | None = None,
+    *,
+    workers: int = 4,
+    partition: Literal["rows", "hash"] | None = None,
+    commit: Literal["all", "slice"] = "all",
+    format: CopyFormat = "text",
+    batch_size: int = 100_000,
+    table_def_ttl: float | None = TABLE_DEF_TTL,
+) -> list[int]:
+    """
+    Sends a polars DataFrame to a PostgreSQL table over several connections at once.
+
+    The frame is split into ``workers`` slices that are each loaded like to_db on
+    their own pooled connection, so the COPY and INSERT work is spread over that
+    many server backends.
+
+    Args:
+        pool (AsyncConnectionPool): psycopg_pool pool to take connections from.
         df (pl.DataFrame): DataFrame to insert into the database.
         target_table (str): Target table name (format: 'schema.table' or 'table').
         upsert (tuple[str] | None, optional): Column names to use as conflict keys for upsert
             operations. Defaults to None.
+        workers (int, optional): Number of slices and concurrent connections.
+            Defaults to 4.
+        partition (Literal["rows", "hash"] | None, optional): "rows" slices by row
+            ranges, "hash" by hash of the upsert keys so that conflicting upserts
+            never run on different connections. None picks "hash" when upserting and
+            "rows" otherwise. Defaults to None.
+        commit (Literal["all", "slice"], optional): "all" keeps every slice's
+            transaction open until all slices loaded and rolls all of them back if
+            any failed, so the pool must be able to hand out ``workers`` connections
+            at once. The final commits are still separate so a connection dying
+            right then can leave a partial load. "slice" commits each slice as soon
+            as it's loaded. Defaults to "all".
+        format (Literal["text", "binary"], optional): COPY format, see to_db.
+            Defaults to "text".
+        batch_size (int, optional): Rows written to the COPY at a time.
+            Defaults to 100_000.
+        table_def_ttl (float | None, optional): See to_db. Defaults to 300.
+
+    Returns
+    -------
+        list[int]: Rows loaded by each worker.
+
+    Raises
+    ------
+        ParallelLoadError: If any slice failed. With commit="slice" the other slices
+            stay committed and their counts are on the exception.
+    """
+    import asyncio
+
+    from psycopg import Rollback
+
+    if upsert is None:
+        upsert = ()
+    if partition is None:
+        partition = "hash" if len(upsert) > 0 else "rows"
+    if commit == "all" and workers > pool.max_size:
+        msg = f"commit='all' needs {workers} connections at once but pool max_size is {pool.max_size}"
+        raise ValueError(msg)
+    async with pool.connection() as conn:
+        table_def = await _get_table_def(conn, target_table, table_def_ttl)
+    parts = _partition_frame(df, workers, partition, upsert)
+    row_counts = [0] * len(parts)
+    errors: dict[int, Exception] = {}
+    pending = len(parts)
+    all_loaded = asyncio.Event()
+
+    def finished(i: int, err: Exception | None = None):
+        nonlocal pending
+        pending -= 1
+        if err is not None:
+            errors[i] = err
+        # on the first failure there's no point making the others wait
+        if pending == 0 or err is not None:
+            all_loaded.set()
+
+    async def wait_for_all():
+        await all_loaded.wait()
+        if errors:
+            raise Rollback
+
+    async def load(i: int, part: pl.DataFrame):
+        loaded = False
+        try:
+            # the connection is taken in here so a pool timeout still counts as
+            # finished and doesn't leave the other slices waiting forever
+            async with pool.connection() as conn, conn.transaction():
+                await _insert_via_temp_table(
+                    conn,
+                    part,
+                    table_def,
+                    target_table,
+                    upsert,
+                    copy_format=format,
+                    batch_size=batch_size,
+                    direct=None if len(upsert) == 0 else False,
+                )
+                loaded = True
+                finished(i)
+                if commit == "all":
+                    await wait_for_all()
+        except Exception as err:
+            if not loaded:
+                finished(i, err)
+            raise
+        # only counted once the COMMIT on leaving the transaction went through
+        if commit == "slice" or not errors:
+            row_counts[i] = part.height
+
+    results = await asyncio.gather(
+        *[load(i, part) for i, part in enumerate(parts)], return_exceptions=True
+    )
+    for i, result in enumerate(results):
+        # a failed COMMIT only surfaces here, after the slice already finished
+        if isinstance(result, Exception):
+            errors.setdefault(i, result)
+    if errors:
+        msg = f"{len(errors)} of {len(parts)} slices failed loading {target_table}"
+        raise ParallelLoadError(msg, row_counts, errors)
+    return row_counts
+
+
+async def to_db_many(
+    conn: AsyncConnection,
+    dfs: dict[str, FrameSource],
+    upserts: dict[str, tuple[str]] | None = None,
+    *,
+    format: CopyFormat = "text",
+    batch_size: int = 100_000,
+    table_def_ttl: float | None = TABLE_DEF_TTL,
+    update_only_changed: bool = False,
+    use_merge: bool = False,
+) -> dict[str, LoadStats]:
+    """
+    Sends several polars DataFrames to their PostgreSQL tables in one transaction.
+
+    The tables are loaded in the order of ``dfs``, so put referenced tables before
+    the ones with foreign keys to them. Everything that doesn't have to wait on
+    the previous statement is sent with psycopg pipeline mode: the catalog lookups
+    of all tables, the staging DDL, and all the INSERTs each take one round trip
+    together. Only the COPYs, which pipeline mode doesn't support, go one table
+    at a time. Rows are always staged, so unlike to_db nothing is COPYed straight
+    into a target ahead of the tables it depends on.
+
+    Args:
+        conn (AsyncConnection): Async connection to the PostgreSQL database.
+        dfs (dict[str, pl.DataFrame | pl.LazyFrame | Iterable[pl.DataFrame]]): Data
+            to insert keyed by target table name ('schema.table' or 'table'), in
+            load order.
+        upserts (dict[str, tuple[str]] | None, optional): Conflict key columns of the
+            tables to upsert into, tables not in it are plain inserts. Defaults to None.
+        format (Literal["text", "binary"], optional): COPY format, see to_db.
+            Defaults to "text".
+        batch_size (int, optional): Rows written to the COPY at a time.
+            Defaults to 100_000.
+        table_def_ttl (float | None, optional): See to_db. Defaults to 300.
+        update_only_changed (bool, optional): See to_db, applies to every table in
+            upserts. Defaults to False.
+        use_merge (bool, optional): See to_db. Defaults to False.
+
+    Returns
+    -------
+        dict[str, LoadStats]: The LoadStats of every table, in load order.
+    """
+    from psycopg.pq import TransactionStatus
+
+    if upserts is None:
+        upserts = {}
+    if use_merge and not update_only_changed:
+        msg = "use_merge only applies with update_only_changed=True"
+        raise ValueError(msg)
+    if use_merge and conn.info.server_version < 150000:
+        msg = "MERGE needs PostgreSQL 15 or later"
+        raise ValueError(msg)
+    if not dfs:
+        return {}
+    all_stats = {table: LoadStats(table) for table in dfs}
+
+    def charge(phase: str, start: float, tables: Sequence[str]) -> None:
+        # statements sent together are charged an equal share to each table
+        elapsed = (time.perf_counter() - start) / len(tables)
+        for table in tables:
+            timings = all_stats[table].timings
+            timings[phase] = timings.get(phase, 0.0) + elapsed
+
+    start = time.perf_counter()
+    table_defs = await _get_table_defs(conn, list(dfs), table_def_ttl)
+    charge("table_def", start, list(dfs))
+
+    loads: list[tuple[str, _LoadPlan, UpdateMode, FrameSource]] = []
+    for table, df in dfs.items():
+        upsert = tuple(upserts.get(table, ()))
+        update_mode: UpdateMode = "all"
+        if len(upsert) > 0 and update_only_changed:
+            update_mode = "merge" if use_merge else "changed"
+        schema, df = _source_schema(df)
+        if schema is None:
+            continue
+        with _phase(all_stats[table], "plan"):
+            plan = _get_load_plan(
+                schema, table_defs[table], table, upsert, format, update_mode
+            )
+        loads.append((table, plan, update_mode, df))
+
+    # tables with the same layout share a staging table, so they have to be
+    # staged and inserted in separate rounds
+    rounds: list[list[tuple[str, _LoadPlan, UpdateMode, FrameSource]]] = []
+    staged: set[str] = set()
+    for load in loads:
+        if not rounds or load[1].staging_table in staged:
+            rounds.append([])
+            staged = set()
+        rounds[-1].append(load)
+        staged.add(load[1].staging_table)
+
+    in_outer_transaction = conn.info.transaction_status != TransactionStatus.IDLE
+    async with conn.transaction():
+        for i, round_loads in enumerate(rounds):
+            async with conn.pipeline():
+                for _, plan, _, _ in round_loads:
+                    await conn.execute(plan.create_table_sql)
+                    if i > 0 or in_outer_transaction:
+                        await conn.execute(plan.truncate_sql)
+            for table, plan, _, df in round_loads:
+                stats = all_stats[table]
+                with _phase(stats, "copy"):
+                    async with conn.cursor() as cur:
+                        await _copy_frames(
+                            cur,
+                            plan.copy_qry,
+                            _iter_batches(df, plan.copy_exprs, batch_size),
+                            plan.temp_types,
+                            format,
+                            stats,
+                        )
+            # one cursor per statement, a cursor only keeps its last result
+            count_curs = {}
+            ins_curs = {}
+            start = time.perf_counter()
+            try:
+                async with conn.pipeline():
+                    for table, plan, _, _ in round_loads:
+                        if plan.count_qry is not None:
+                            count_curs[table] = conn.cursor()
+                            await count_curs[table].execute(plan.count_qry)
+                        ins_curs[table] = conn.cursor()
+                        await ins_curs[table].execute(plan.ins_qry)
+                # the pipeline is synced on exit, so every result is in by now
+                for table, plan, update_mode, _ in round_loads:
+                    counts = None
+                    if plan.count_qry is not None:
+                        counts = await count_curs[table].fetchone()
+                    if plan.ins_returns_counts:
+                        counts = await ins_curs[table].fetchone()
+                    stats = all_stats[table]
+                    _add_insert_counts(
+                        stats, update_mode, stats.rows, ins_curs[table].rowcount, counts
+                    )
+            finally:
+                for cur in chain(count_curs.values(), ins_curs.values()):
+                    await cur.close()
+            charge("insert", start, [table for table, _, _, _ in round_loads])
+    return all_stats
+
+
+async def _delete_keys(
+    conn: AsyncConnection,
+    keys: pl.DataFrame,
+    tables: Sequence[str],
+    table_def: pl.DataFrame,
+    copy_format: CopyFormat,
+    batch_size: int,
+    stats: LoadStats,
+) -> int:
+    """
+    Delete the rows matching ``keys`` from every table, returns the count from the first.
+
+    The keys are staged like any other load, planned against ``table_def`` of the
+    first table. Only their bytes are added to ``stats``, they aren't rows of the
+    load.
+    """
+    from psycopg.sql import SQL, Identifier
+
+    plan = _get_load_plan(keys.schema, table_def, tables[0], (), copy_format)
+    key_stats = LoadStats(tables[0])
+    async with conn.cursor() as cur:
+        await cur.execute(plan.create_table_sql)
+        # earlier loads in this transaction may have left rows in it
+        await cur.execute(plan.truncate_sql)
+        await _copy_frames(
+            cur,
+            plan.copy_qry,
+            _iter_batches(keys, plan.copy_exprs, batch_size),
+            plan.temp_types,
+            copy_format,
+            key_stats,
+        )
+        deleted = []
+        for table in tables:
+            target = SQL("{}.{}").format(
+                *(Identifier(x) for x in _split_table_name(table))
+            )
+            await cur.execute(
+                SQL("DELETE FROM {} AS t USING {} AS source WHERE ({}) = ({})").format(
+                    target,
+                    Identifier(plan.staging_table),
+                    SQL(", ").join(
+                        [SQL("t.{}").format(Identifier(x)) for x in plan.columns]
+                    ),
+                    SQL(", ").join(plan.source_values),
+                )
+            )
+            deleted.append(cur.rowcount)
+    stats.bytes = (stats.bytes or 0) + (key_stats.bytes or 0)
+    return deleted[0]
+
+
+async def to_db_delta(
+    conn: AsyncConnection,
+    df: pl.DataFrame | pl.LazyFrame,
+    target_table: str,
+    upsert: tuple[str],
+    *,
+    hash_column: str = "row_hash",
+    hash_table: str | None = None,
+    delete_missing: bool = False,
+    format: CopyFormat = "text",
+    batch_size: int = 100_000,
+    table_def_ttl: float | None = TABLE_DEF_TTL,
+) -> LoadStats:
+    """
+    Sends only the new and changed rows of a full snapshot to a PostgreSQL table.
+
+    Every row is hashed in polars, the upsert keys and hashes already stored are
+    read back with from_db, and only rows whose key is new or whose hash differs
+    are upserted, together with their new hash. Rows that were written without
+    a hash count as changed. polars doesn't promise the same hashes across
+    versions, so upgrading it makes one load resend everything.
+
+    Args:
+        conn (AsyncConnection): Async connection to the PostgreSQL database.
+        df (pl.DataFrame | pl.LazyFrame): The full snapshot.
+        target_table (str): Target table name (format: 'schema.table' or 'table').
+        upsert (tuple[str]): Key columns identifying a row, with a unique
+            constraint on them in target_table.
+        hash_column (str, optional): Name of the bigint column holding row hashes.
+            Without hash_table it has to be a column of target_table.
+            Defaults to "row_hash".
+        hash_table (str | None, optional): Keep the hashes in this side table
+            instead of target_table. It's created with the upsert columns as
+            primary key if it doesn't exist. Defaults to None.
+        delete_missing (bool, optional): Also delete rows whose key isn't in the
+            snapshot anymore (from hash_table too). Defaults to False.
+        format (Literal["text", "binary"], optional): COPY format, see to_db.
+            Defaults to "text".
+        batch_size (int, optional): Rows written to the COPY at a time.
+            Defaults to 100_000.
+        table_def_ttl (float | None, optional): See to_db. Defaults to 300.
+
+    Returns
+    -------
+        LoadStats: As for to_db, with ``unchanged`` counting the snapshot rows that
+            weren't sent and ``deleted`` the rows removed by delete_missing.
     """
-    table_def = await _get_table_def(conn, target_table)
-    await _insert_via_temp_table(conn, df, table_def, target_table, upsert)
+    import polars as pl
+    from psycopg.sql import SQL, Identifier
+
+    if len(upsert) == 0:
+        msg = "to_db_delta needs upsert keys"
+        raise ValueError(msg)
+    upsert = tuple(upsert)
+    stats = LoadStats(target_table)
+    with _phase(stats, "table_def"):
+        table_def = await _get_table_def(conn, target_table, table_def_ttl)
+    if hash_table is None and hash_column not in table_def["column_name"]:
+        msg = f"{target_table} has no {hash_column} column, add one or use hash_table"
+        raise ValueError(msg)
+    lf = df.lazy()
+    schema = lf.collect_schema()
+    keys = SQL(", ").join([Identifier(x) for x in upsert])
+    target = SQL("{}.{}").format(
+        *(Identifier(x) for x in _split_table_name(target_table))
+    )
+    hash_source = target
+    if hash_table is not None:
+        hash_source = SQL("{}.{}").format(
+            *(Identifier(x) for x in _split_table_name(hash_table))
+        )
+
+    async with conn.transaction():
+        if hash_table is not None:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT to_regclass(%s) IS NULL",
+                    (".".join(_split_table_name(hash_table)),),
+                )
+                (missing,) = await cur.fetchone()
+            if missing:
+                await conn.execute(
+                    SQL(
+                        "CREATE TABLE {} AS SELECT {}, NULL::bigint AS {} FROM {} WITH NO DATA"
+                    ).format(hash_source, keys, Identifier(hash_column), target)
+                )
+                await conn.execute(
+                    SQL("ALTER TABLE {} ADD PRIMARY KEY ({})").format(hash_source, keys)
+                )
+        with _phase(stats, "hash"):
+            existing = await from_db(
+                conn,
+                SQL("SELECT {}, {} FROM {}").format(
+                    keys, Identifier(hash_column), hash_source
+                ),
+            )
+            existing = existing.with_columns(
+                pl.col(x).cast(schema[x]) for x in upsert
+            ).rename({hash_column: "__existing_hash"})
+            hashed = lf.with_columns(
+                pl.struct(x for x in schema.names() if x != hash_column)
+                .hash()
+                .reinterpret(signed=True)
+                .alias(hash_column)
+            )
+            delta = (
+                hashed.join(existing.lazy(), on=upsert, how="left")
+                .filter(pl.col(hash_column).ne_missing(pl.col("__existing_hash")))
+                .drop("__existing_hash")
+                .collect()
+            )
+            total = lf.select(pl.len()).collect().item()
+        stats.unchanged = total - delta.height
+        if delta.height > 0:
+            await _insert_via_temp_table(
+                conn,
+                delta if hash_table is None else delta.drop(hash_column),
+                table_def,
+                target_table,
+                upsert,
+                copy_format=format,
+                batch_size=batch_size,
+                stats=stats,
+            )
+            if hash_table is not None:
+                await _insert_via_temp_table(
+                    conn,
+                    delta.select(*upsert, hash_column),
+                    await _get_table_def(conn, hash_table, table_def_ttl),
+                    hash_table,
+                    upsert,
+                    copy_format=format,
+                    batch_size=batch_size,
+                )
+        if delete_missing:
+            with _phase(stats, "delete"):
+                gone = existing.select(upsert).join(
+                    lf.select(upsert).collect(), on=upsert, how="anti"
+                )
+                stats.deleted = 0
+                if gone.height > 0:
+                    stats.deleted = await _delete_keys(
+                        conn,
+                        gone,
+                        [target_table]
+                        if hash_table is None
+                        else [target_table, hash_table],
+                        table_def,
+                        format,
+                        batch_size,
+                        stats,
+                    )
+    return stats
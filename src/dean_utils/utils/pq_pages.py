@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import struct
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from pyarrow.parquet import ColumnChunkMetaData, FileMetaData
+
+# thrift compact protocol type ids
+_STOP = 0
+_TRUE = 1
+_FALSE = 2
+_BYTE = 3
+_I16 = 4
+_I32 = 5
+_I64 = 6
+_DOUBLE = 7
+_BINARY = 8
+_LIST = 9
+_SET = 10
+_MAP = 11
+_STRUCT = 12
+
+# parquet.thrift enums
+DATA_PAGE = 0
+DICTIONARY_PAGE = 2
+DATA_PAGE_V2 = 3
+PLAIN_DICTIONARY = 2
+RLE_DICTIONARY = 8
+DICTIONARY_ENCODINGS = (PLAIN_DICTIONARY, RLE_DICTIONARY)
+
+# parquet codec -> pyarrow codec, LZ4 (the hadoop framed one) isn't supported
+CODECS = {
+    "SNAPPY": "snappy",
+    "GZIP": "gzip",
+    "BROTLI": "brotli",
+    "ZSTD": "zstd",
+    "LZ4_RAW": "lz4_raw",
+}
+PLAIN_WIDTHS = {"INT32": "<i4", "INT64": "<i8", "FLOAT": "<f4", "DOUBLE": "<f8"}
+
+
+class _CompactReader:
+    """Just enough of thrift's compact protocol to read parquet structs into dicts."""
+
+    def __init__(self, buf: bytes, pos: int = 0):
+        self.buf = buf
+        self.pos = pos
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.buf[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def skip(self, n: int) -> None:
+        # slicing past the end doesn't raise, so a truncated buffer is caught here
+        if self.pos + n > len(self.buf):
+            msg = "thrift struct runs past the end of the buffer"
+            raise IndexError(msg)
+        self.pos += n
+
+    def zigzag(self) -> int:
+        n = self.varint()
+        return (n >> 1) ^ -(n & 1)
+
+    def value(self, kind: int) -> Any:
+        if kind in (_TRUE, _FALSE):
+            # only inside lists, fields carry their boolean in the type
+            self.pos += 1
+            return self.buf[self.pos - 1] == _TRUE
+        if kind == _BYTE:
+            self.pos += 1
+            return self.buf[self.pos - 1]
+        if kind in (_I16, _I32, _I64):
+            return self.zigzag()
+        if kind == _DOUBLE:
+            self.skip(8)
+            return struct.unpack_from("<d", self.buf, self.pos - 8)[0]
+        if kind == _BINARY:
+            n = self.varint()
+            self.skip(n)
+            return self.buf[self.pos - n : self.pos]
+        if kind in (_LIST, _SET):
+            header = self.buf[self.pos]
+            self.pos += 1
+            size = header >> 4
+            if size == 15:
+                size = self.varint()
+            return [self.value(header & 0x0F) for _ in range(size)]
+        if kind == _MAP:
+            size = self.varint()
+            if size == 0:
+                return {}
+            types = self.buf[self.pos]
+            self.pos += 1
+            return {
+                self.value(types >> 4): self.value(types & 0x0F) for _ in range(size)
+            }
+        if kind == _STRUCT:
+            return self.struct()
+        msg = f"unknown thrift compact type {kind}"
+        raise ValueError(msg)
+
+    def struct(self) -> dict[int, Any]:
+        fields: dict[int, Any] = {}
+        field_id = 0
+        while True:
+            header = self.buf[self.pos]
+            self.pos += 1
+            kind = header & 0x0F
+            if kind == _STOP:
+                return fields
+            delta = header >> 4
+            field_id = field_id + delta if delta else self.zigzag()
+            if kind in (_TRUE, _FALSE):
+                fields[field_id] = kind == _TRUE
+            else:
+                fields[field_id] = self.value(kind)
+
+
+def encoding_stats(metadata: FileMetaData) -> list[list[list | None]]:
+    """
+    Return the page encoding stats of every column chunk, by row group then column.
+
+    pyarrow doesn't expose ColumnMetaData.encoding_stats, so the footer is
+    serialized again and read here. Each entry is a list of
+    ``(page_type, encoding, count)`` or None when the writer didn't record them.
+    """
+    import pyarrow as pa
+
+    out = pa.BufferOutputStream()
+    metadata.write_metadata_file(out)
+    # PAR1, the FileMetaData struct, its length and PAR1 again
+    file_metadata = _CompactReader(out.getvalue().to_pybytes(), 4).struct()
+    stats = []
+    for row_group in file_metadata.get(4, []):
+        columns = []
+        for chunk in row_group.get(1, []):
+            page_stats = chunk.get(3, {}).get(13)
+            columns.append(
+                None
+                if page_stats is None
+                else [(s.get(1), s.get(2), s.get(3)) for s in page_stats]
+            )
+        stats.append(columns)
+    return stats
+
+
+def dictionary_only(chunk: ColumnChunkMetaData, page_stats: list | None) -> bool | None:
+    """
+    Whether every data page of ``chunk`` is dictionary encoded, None if unknown.
+
+    Writers can fall back to plain pages once a dictionary gets too big, and
+    only without that does the dictionary page hold every value of the chunk.
+    The encoding stats say so directly. Without them the chunk's encodings only
+    tell for v1 files, where the dictionary page is PLAIN_DICTIONARY so PLAIN
+    means plain data pages. In later versions the dictionary page itself is
+    PLAIN, so the data page headers have to be checked.
+    """
+    offset = chunk.dictionary_page_offset
+    if not chunk.has_dictionary_page or not 0 < offset < chunk.data_page_offset:
+        return False
+    if page_stats is not None:
+        return all(
+            encoding in DICTIONARY_ENCODINGS
+            for page_type, encoding, _ in page_stats
+            if page_type in (DATA_PAGE, DATA_PAGE_V2)
+        )
+    encodings = set(chunk.encodings)
+    if not encodings & {"PLAIN_DICTIONARY", "RLE_DICTIONARY"}:
+        return False
+    if "PLAIN" not in encodings:
+        return True
+    return None if "PLAIN_DICTIONARY" not in encodings else False
+
+
+def read_page_header(data: bytes, pos: int = 0) -> tuple[dict[int, Any], int]:
+    """
+    Return the PageHeader starting at ``pos`` of ``data`` and where it ends.
+
+    Raises IndexError when ``data`` ends before the header does.
+    """
+    reader = _CompactReader(data, pos)
+    header = reader.struct()
+    return header, reader.pos
+
+
+def page_encoding(header: dict[int, Any]) -> int | None:
+    """Return the encoding of a data page's values, None for other pages."""
+    if header.get(1) == DATA_PAGE:
+        return header.get(5, {}).get(2)
+    if header.get(1) == DATA_PAGE_V2:
+        return header.get(8, {}).get(4)
+    return None
+
+
+def decode_dictionary_page(
+    data: bytes, chunk: ColumnChunkMetaData, type_length: int, arrow_type: pa.DataType
+) -> list | None:
+    """
+    Return the values of the dictionary page at the start of ``data``.
+
+    Parameters
+    ----------
+    data : bytes
+        The column chunk from its dictionary page offset, at least up to the
+        end of the dictionary page.
+    chunk : ColumnChunkMetaData
+        Metadata of the column chunk, for its physical type and codec.
+    type_length : int
+        Width of FIXED_LEN_BYTE_ARRAY values.
+    arrow_type : pa.DataType
+        Type pyarrow reads the column as, the values are cast to it so they
+        compare equal to the column's statistics.
+
+    Returns
+    -------
+    list | None
+        The distinct values of the chunk, or None when the page can't be decoded
+        here (unsupported codec, physical or logical type) and the chunk has to be
+        read instead.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    physical = chunk.physical_type
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    castable = (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_date32(arrow_type)
+        or pa.types.is_timestamp(arrow_type)
+        or pa.types.is_time(arrow_type)
+        or pa.types.is_string(arrow_type)
+        or pa.types.is_large_string(arrow_type)
+        or pa.types.is_binary(arrow_type)
+        or pa.types.is_large_binary(arrow_type)
+        or pa.types.is_fixed_size_binary(arrow_type)
+    )
+    codec = chunk.compression
+    if not castable or (codec != "UNCOMPRESSED" and codec not in CODECS):
+        return None
+
+    header, body_start = read_page_header(data)
+    dict_header = header.get(7)
+    if header.get(1) != DICTIONARY_PAGE or dict_header is None:
+        return None
+    body = data[body_start : body_start + header[3]]
+    if codec != "UNCOMPRESSED":
+        body = pa.Codec(CODECS[codec]).decompress(body, header[2]).to_pybytes()
+    n = dict_header[1]
+
+    if physical in PLAIN_WIDTHS:
+        dtype = PLAIN_WIDTHS[physical]
+        if pa.types.is_unsigned_integer(arrow_type):
+            # unsigned logical types are stored in the signed physical ones
+            dtype = dtype.replace("i", "u")
+        values = pa.array(np.frombuffer(body, dtype=dtype, count=n))
+    elif physical == "BYTE_ARRAY":
+        items = []
+        pos = 0
+        for _ in range(n):
+            size = int.from_bytes(body[pos : pos + 4], "little")
+            items.append(body[pos + 4 : pos + 4 + size])
+            pos += 4 + size
+        values = pa.array(items, pa.binary())
+    elif physical == "FIXED_LEN_BYTE_ARRAY":
+        values = pa.array(
+            [body[i * type_length : (i + 1) * type_length] for i in range(n)],
+            pa.binary(type_length),
+        )
+    else:
+        return None
+    return values.cast(arrow_type).to_pylist()